@@ -3,12 +3,14 @@
 import html
 import logging
 import os
+import time
 from datetime import datetime, timedelta, timezone
 from threading import Lock
 from typing import Dict
 
 from dotenv import load_dotenv
-from flask import Flask, request, session, make_response, Response, jsonify, g
+from flask import Flask, request, session, make_response, Response, g
+import orjson
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 load_dotenv()
@@ -43,6 +45,7 @@ from routes.user_routes import user_bp
 
 # Services
 from audit_logger import audit_logger
+from utils.helpers import json_response
 
 
 # --- Logging Setup ---
@@ -116,16 +119,28 @@ def wants_json_response() -> bool:
 @app.before_request
 def update_last_seen():
     if "last_active" in session:
-        session["last_active"] = _tz_now().isoformat()
+        session["last_active"] = time.time()
+
+# (lowercased name, name, value); added only when the handler did not set them
+_SECURITY_HEADERS = tuple(
+    (name.lower(), name, value)
+    for name, value in (
+        ("X-Content-Type-Options", "nosniff"),
+        ("X-Frame-Options", "DENY"),
+        ("Referrer-Policy", "no-referrer"),
+        ("X-XSS-Protection", "1; mode=block"),
+        ("Content-Security-Policy", settings.content_security_policy),
+        ("Cache-Control", "no-store"),
+    )
+)
 
 @app.after_request
 def add_security_headers(response: Response):
-    response.headers.setdefault("X-Content-Type-Options", "nosniff")
-    response.headers.setdefault("X-Frame-Options", "DENY")
-    response.headers.setdefault("Referrer-Policy", "no-referrer")
-    response.headers.setdefault("X-XSS-Protection", "1; mode=block")
-    response.headers.setdefault("Content-Security-Policy", settings.content_security_policy)
-    response.headers.setdefault("Cache-Control", "no-store")
+    headers = response.headers
+    existing = {name.lower() for name in headers.keys()}
+    for lowered, name, value in _SECURITY_HEADERS:
+        if lowered not in existing:
+            headers.add(name, value)
     if request.path.startswith("/api/v1"):
         origin = request.headers.get("Origin")
         if origin and origin in settings.cors_origins:
@@ -159,7 +174,7 @@ def log_request_start():
     """Log incoming request details to access log."""
     from middleware.log_rotation import get_logger
     access_logger = get_logger("app.access")
-    g.start_time = _tz_now()
+    g.start_time = time.perf_counter()
     access_logger.info(
         f"request_start method={request.method} path={request.path} ip={request.remote_addr or 'unknown'} "
         f"user_agent={request.user_agent.string[:100] if request.user_agent else 'unknown'}"
@@ -172,7 +187,7 @@ def log_request_complete(response: Response):
     access_logger = get_logger("app.access")
     duration_ms = 0
     if hasattr(g, "start_time"):
-        duration_ms = (_tz_now() - g.start_time).total_seconds() * 1000
+        duration_ms = (time.perf_counter() - g.start_time) * 1000
 
     access_logger.info(
         f"request_complete method={request.method} path={request.path} status={response.status_code} "
@@ -213,26 +228,43 @@ def log_request_complete(response: Response):
     return response
 
 # --- Web Dashboard Routes ---
-@app.route("/")
-def index():
-    """Serve the beautiful index page."""
-    index_path = os.path.join(os.path.dirname(__file__), "index.html")
-    if os.path.exists(index_path):
-        with open(index_path, "r", encoding="utf-8") as f:
-            return f.read(), 200, {"Content-Type": "text/html; charset=utf-8"}
-    return """<!DOCTYPE html>
+_FALLBACK_INDEX_HTML = """<!DOCTYPE html>
 <html lang="en">
 <head><meta charset="UTF-8"><title>SEM</title></head>
 <body style="font-family:system-ui;max-width:800px;margin:50px auto;padding:20px;background:#0a0a0f;color:#e4e4e7">
 <h1 style="color:#8b5cf6">🔐 Secure Environment Manager</h1>
 <p>Backend is running. Open <a href="http://localhost:3000" style="color:#a78bfa">http://localhost:3000</a> for the web dashboard.</p>
 <p><small>API: <code>GET /api/v1/{namespace}/{environment}</code> (requires Bearer token)</small></p>
-</body></html>""", 200
+</body></html>"""
+
+
+def _load_index_html() -> bytes:
+    """Read the static landing page once at startup."""
+    index_path = os.path.join(os.path.dirname(__file__), "index.html")
+    if os.path.exists(index_path):
+        with open(index_path, "rb") as f:
+            return f.read()
+    return _FALLBACK_INDEX_HTML.encode("utf-8")
+
+
+_INDEX_HTML_BYTES = _load_index_html()
+
+
+@app.route("/")
+def index():
+    """Serve the beautiful index page."""
+    response = Response(_INDEX_HTML_BYTES, mimetype="text/html")
+    # Static landing page: allow caching instead of the blanket no-store
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
+# Health probes hit this constantly; the body never changes
+_HEALTHZ_BODY = orjson.dumps({"status": "healthy"})
 
 @app.route("/healthz")
 def health_check():
     """Health check endpoint for Docker and monitoring."""
-    return jsonify({"status": "healthy"}), 200
+    return Response(_HEALTHZ_BODY, mimetype="application/json")
 
 # --- Error Handler ---
 @app.errorhandler(Exception)
@@ -241,7 +273,7 @@ def handle_errors(err):
     description = getattr(err, "description", "Unexpected error")
     logger.exception("Unhandled error: %s", err)
     if wants_json_response():
-        return jsonify({"error": description, "status": code}), code
+        return json_response({"error": description, "status": code}, code)
     safe = html.escape(str(description))
     body = f"""<!DOCTYPE html>
 <html lang="en"><head><meta charset="utf-8"/><title>Error {code}</title></head>
@@ -24,6 +24,10 @@ from services.audit_service import AuditService, audit_service
 class AuditLogger:
     """Legacy wrapper class for backward compatibility.
 
+    Entries are built on the calling thread and queued for the file
+    logger's flusher thread, which appends them in batches; reads flush
+    that queue first.
+
     New code should use AuditService from services.audit_service instead.
     """
 
@@ -40,7 +44,7 @@ class AuditLogger:
         return self._service._get_timestamp()
 
     def _hash_value(self, value: str) -> str:
-        """Create SHA-256 hash of a value for audit trail."""
+        """Create a 64-bit BLAKE2b fingerprint of a value for audit trail."""
         return self._service._hash_value(value)
 
     def _sanitize_field(self, key: str, value) -> any:
@@ -51,6 +55,10 @@ class AuditLogger:
         """Recursively sanitize audit payload prior to serialization."""
         return self._service._sanitize_for_storage(value)
 
+    def flush(self):
+        """Wait until all queued audit events are on disk."""
+        self._service._file_logger.flush()
+
     def _write_log(self, log_entry):
         """Write log entry to file, rotating if necessary."""
         self._service._write_log(log_entry)
@@ -61,6 +69,12 @@ class AuditLogger:
     def log_variable_update(self, namespace, environment, key, old_value, new_value, user_id, ip_address):
         self._service.log_variable_update(namespace, environment, key, old_value, new_value, user_id, ip_address)
 
+    def log_variable_changes(self, namespace, environment, changes, user_id, ip_address):
+        self._service.log_variable_changes(namespace, environment, changes, user_id, ip_address)
+
+    def log_events(self, entries):
+        self._service.log_events(entries)
+
     def log_variable_delete(self, namespace, environment, key, value, user_id, ip_address):
         self._service.log_variable_delete(namespace, environment, key, value, user_id, ip_address)
 
@@ -5,6 +5,7 @@ Re-exports constants, config, and runtime values.
 from core.constants import (
     SEGMENT_PATTERN,
     KEY_PATTERN,
+    ENV_LINE_PATTERN,
     SESSION_MAX_LIFETIME,
     STEP_UP_AUTH_WINDOW,
     SECRET_AUTO_HIDE_DELAY_MS,
@@ -16,7 +17,7 @@ from core.constants import (
     get_max_login_attempts,
 )
 
-from core.config import settings, fernet, DATA_DIR, API_KEYS_FILE, DATA_LOCKS, spa_url
+from core.config import settings, fernet, cipher, DATA_DIR, API_KEYS_FILE, DATA_LOCKS, spa_url
 from core.sessions import (
     current_identity,
     clear_auth,
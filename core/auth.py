@@ -5,6 +5,7 @@ Extracted from app.py for modular architecture.
 import hmac
 import secrets
 import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 from typing import Any, Dict, Tuple
@@ -13,6 +14,7 @@ from flask import Response, jsonify, redirect, request, session
 from werkzeug.security import check_password_hash
 
 from core.config import settings, logger
+from core.constants import SESSION_MAX_LIFETIME, get_session_timeout
 from core.sessions import (
     current_identity,
     clear_auth,
@@ -27,6 +29,10 @@ LOGIN_ATTEMPTS: Dict[str, Dict[str, Any]] = {}
 LOCKOUT_DELTA = timedelta(minutes=settings.lockout_minutes)
 MAX_LOGIN_ATTEMPTS = settings.max_login_attempts
 
+# Session timestamps are epoch seconds; compare against precomputed limits
+_SESSION_TIMEOUT_SECS = get_session_timeout().total_seconds()
+_SESSION_MAX_LIFETIME_SECS = SESSION_MAX_LIFETIME.total_seconds()
+
 
 def _tz_now() -> datetime:
     """Get current UTC time."""
@@ -62,20 +68,28 @@ def is_locked(identifier: str) -> Tuple[bool, datetime | None]:
     return False, None
 
 
+# CSRF tokens are HMACs of a per-session seed, so only the seed lives in the cookie
+_CSRF_KEY = settings.flask_secret_key.encode()
+
+
+def _csrf_token_for(seed: str) -> str:
+    """Derive the CSRF token for a session seed."""
+    return hmac.new(_CSRF_KEY, seed.encode(), hashlib.sha256).hexdigest()
+
+
 def generate_csrf_token() -> str:
-    """Generate and store a CSRF token in the session."""
-    token = session.get("csrf_token")
-    if not token:
-        token = secrets.token_urlsafe(32)
-        session["csrf_token"] = token
-    return token
+    """Return the CSRF token for the current session, seeding it on first use."""
+    seed = session.get("csrf_seed")
+    if not seed:
+        seed = session["csrf_seed"] = secrets.token_hex(16)
+    return _csrf_token_for(seed)
 
 
 def validate_csrf() -> None:
     """Validate the submitted CSRF token."""
-    token = session.get("csrf_token")
+    seed = session.get("csrf_seed")
     submitted = request.form.get("csrf_token") or request.headers.get("X-CSRF-Token")
-    if not token or not submitted or not hmac.compare_digest(token, submitted):
+    if not seed or not submitted or not hmac.compare_digest(_csrf_token_for(seed), submitted):
         from flask import abort
         abort(400, description="CSRF token missing or invalid")
 
@@ -240,7 +254,6 @@ def ensure_authenticated(fn):
     """Decorator ensuring user is authenticated for web dashboard access."""
     @wraps(fn)
     def wrapper(namespace: str, environment: str, *args, **kwargs):
-        from core import SESSION_MAX_LIFETIME
         from core.sessions import _update_session_activity
 
         from utils.helpers import validate_segments
@@ -250,33 +263,21 @@ def ensure_authenticated(fn):
         last_active = session.get("last_active")
         session_created = session.get("session_created")
         session_id = record.get("id") if record else None
-
-        # Check inactivity timeout
-        if last_active:
-            try:
-                last_dt = datetime.fromisoformat(last_active)
-                from core.constants import get_session_timeout
-                if _tz_now() - last_dt > get_session_timeout():
-                    clear_auth(namespace, environment)
-                    if session_id:
-                        _invalidate_session(session_id)
-                    return _session_expired_redirect(namespace, environment)
-            except ValueError:
-                clear_auth(namespace, environment)
-                return _session_expired_redirect(namespace, environment)
-
-        # Check absolute session lifetime (24 hours)
-        if session_created:
-            try:
-                created_dt = datetime.fromisoformat(session_created)
-                if _tz_now() - created_dt > SESSION_MAX_LIFETIME:
-                    clear_auth(namespace, environment)
-                    if session_id:
-                        _invalidate_session(session_id)
-                    return _session_expired_redirect(namespace, environment)
-            except ValueError:
-                clear_auth(namespace, environment)
-                return _session_expired_redirect(namespace, environment)
+        now = time.time()
+
+        # Sessions issued before timestamps became epoch floats hold ISO strings
+        if (last_active and not isinstance(last_active, (int, float))) or \
+                (session_created and not isinstance(session_created, (int, float))):
+            clear_auth(namespace, environment)
+            return _session_expired_redirect(namespace, environment)
+
+        # Check inactivity timeout, then absolute session lifetime (24 hours)
+        if (last_active and now - last_active > _SESSION_TIMEOUT_SECS) or \
+                (session_created and now - session_created > _SESSION_MAX_LIFETIME_SECS):
+            clear_auth(namespace, environment)
+            if session_id:
+                _invalidate_session(session_id)
+            return _session_expired_redirect(namespace, environment)
 
         if not record:
             if request.method in ("GET", "HEAD"):
@@ -290,7 +291,7 @@ def ensure_authenticated(fn):
             )
 
         # Update activity timestamps
-        session["last_active"] = _tz_now().isoformat()
+        session["last_active"] = now
         if session_id:
             _update_session_activity(session_id)
 
@@ -312,37 +313,13 @@ def _session_expired_redirect(namespace: str, environment: str):
 
 def _load_api_keys() -> Dict[str, str]:
     """Load API keys from file."""
-    import json
-    import os
-    from core.config import API_KEYS_FILE
-
-    if not os.path.exists(API_KEYS_FILE):
-        return {}
-    try:
-        with open(API_KEYS_FILE, "r", encoding="utf-8") as handle:
-            data = json.load(handle)
-            if isinstance(data, dict):
-                return {str(k): str(v) for k, v in data.items()}
-    except json.JSONDecodeError as exc:
-        logger.error("Unable to parse api_keys file: %s", exc)
-    return {}
+    from utils.helpers import load_api_keys
+
+    return load_api_keys()
 
 
 def _list_all_environments() -> Dict[str, list[str]]:
     """List all available environments grouped by namespace."""
-    from collections import defaultdict
-    import os
-    from core.config import DATA_DIR
-
-    envs = defaultdict(list)
-    if not os.path.exists(DATA_DIR):
-        return envs
-
-    for ns_dir in os.listdir(DATA_DIR):
-        ns_path = os.path.join(DATA_DIR, ns_dir)
-        if os.path.isdir(ns_path):
-            for filename in os.listdir(ns_path):
-                if filename.endswith(".enc"):
-                    env_name = filename[:-4]
-                    envs[ns_dir].append(env_name)
-    return envs
\ No newline at end of file
+    from utils.helpers import list_all_environments
+
+    return list_all_environments()
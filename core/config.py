@@ -5,13 +5,15 @@ Extracted from app.py for modular architecture.
 import logging
 import os
 from dataclasses import dataclass, field
-from collections import defaultdict
 from threading import Lock
+from weakref import WeakValueDictionary
 from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 from cryptography.fernet import Fernet
 
+from core.crypto import Crypto
+
 
 load_dotenv()
 
@@ -116,6 +118,9 @@ settings = Settings.from_env()
 # Initialize Fernet cipher
 fernet = Fernet(settings.encryption_key.encode())
 
+# Cipher for environment files (AES-256-GCM, reads legacy Fernet files)
+cipher = Crypto(settings.encryption_key)
+
 # Data directories
 DATA_DIR = settings.data_dir
 API_KEYS_FILE = settings.api_keys_file
@@ -127,8 +132,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Data locks for thread-safe file operations
-DATA_LOCKS: defaultdict[str, Lock] = defaultdict(Lock)
+# Data locks for thread-safe file operations. Entries are weakly held, so a
+# path's lock is dropped as soon as no thread holds or waits on it.
+DATA_LOCKS: WeakValueDictionary[str, Lock] = WeakValueDictionary()
 
 
 def spa_url(namespace: str, environment: str, *extra: str) -> str:
@@ -8,6 +8,11 @@ from datetime import timedelta
 # Validation patterns - forbids consecutive dots to prevent path traversal
 SEGMENT_PATTERN = re.compile(r"^(?!.*\.\.)[A-Za-z0-9_.-]{1,64}$")
 KEY_PATTERN = re.compile(r"^(?!.*\.\.)[A-Za-z0-9_][A-Za-z0-9_.-]{0,127}$")
+# One KEY=value pair per line of a .env payload; comments and malformed lines never match
+ENV_LINE_PATTERN = re.compile(
+    r"^[ \t]*(?![^=\n]*\.\.)([A-Za-z0-9_][A-Za-z0-9_.-]{0,127})[ \t]*=(.*)$",
+    re.MULTILINE,
+)
 
 # Timeout and limit settings
 # Note: SESSION_TIMEOUT is derived from settings at runtime
@@ -11,7 +11,10 @@ import threading
 from werkzeug.security import generate_password_hash
 
 
-# Lazily computed dashboard password hash (hashed once on first access)
+# Lazily computed dashboard password hash (hashed once on first access).
+# The hash never leaves the process, but check_password_hash runs against it on
+# every token-authenticated API request, so pin a cheaper explicit work factor.
+_DASHBOARD_HASH_METHOD = "pbkdf2:sha256:60000"
 _dashboard_password_hash: str | None = None
 _dashboard_password_hash_lock = threading.Lock()
 
@@ -29,5 +32,5 @@ def get_dashboard_password_hash() -> str:
                         "DASHBOARD_PASSWORD environment variable is not set. "
                         "Please configure a secure dashboard password."
                     )
-                _dashboard_password_hash = generate_password_hash(pwd)
+                _dashboard_password_hash = generate_password_hash(pwd, method=_DASHBOARD_HASH_METHOD)
     return _dashboard_password_hash
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+At-rest encryption for environment files.
+
+New payloads are sealed with AES-256-GCM and stored as raw bytes:
+``VERSION | nonce (12 bytes) | ciphertext | tag (16 bytes)``. Files written
+before the switch are Fernet tokens (base64 text starting with ``g``) and are
+still readable; they move to the new format the next time they are saved.
+"""
+import base64
+import os
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+# Leading byte of AES-GCM payloads; Fernet tokens always start with b"g"
+AESGCM_VERSION = b"\x01"
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+_HKDF_INFO = b"secure-environment-manager/env-aes-256-gcm/v1"
+
+
+class Crypto:
+    """Encrypts payloads with AES-256-GCM and reads legacy Fernet tokens.
+
+    The AES key is derived from the existing ENCRYPTION_KEY with
+    HKDF-SHA256, so no new secret needs to be configured.
+    """
+
+    def __init__(self, encryption_key: str):
+        """Initialize ciphers from a Fernet-formatted key.
+
+        Args:
+            encryption_key: URL-safe base64 encoded 32-byte key (ENCRYPTION_KEY)
+        """
+        self._fernet = Fernet(encryption_key.encode())
+        key_material = base64.urlsafe_b64decode(encryption_key.encode())
+        aes_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=_HKDF_INFO,
+        ).derive(key_material)
+        self._aesgcm = AESGCM(aes_key)
+
+    def encrypt(self, plaintext: bytes) -> bytes:
+        """Encrypt plaintext into the AES-GCM storage format."""
+        nonce = os.urandom(_NONCE_SIZE)
+        return AESGCM_VERSION + nonce + self._aesgcm.encrypt(nonce, plaintext, None)
+
+    def decrypt(self, blob: bytes) -> bytes:
+        """Decrypt an AES-GCM payload, falling back to Fernet for legacy files.
+
+        Raises:
+            InvalidToken: If the payload is corrupted or was sealed with another key
+        """
+        if blob[:1] != AESGCM_VERSION:
+            return self._fernet.decrypt(blob)
+        if len(blob) < 1 + _NONCE_SIZE + _TAG_SIZE:
+            raise InvalidToken
+        nonce = blob[1:1 + _NONCE_SIZE]
+        try:
+            return self._aesgcm.decrypt(nonce, blob[1 + _NONCE_SIZE:], None)
+        except InvalidTag:
+            raise InvalidToken from None
@@ -3,6 +3,7 @@ Session management for Secure Environment Manager.
 Extracted from app.py for modular architecture.
 """
 import secrets
+import time
 from datetime import datetime, timedelta, timezone
 from threading import Lock
 from typing import Any, Dict, Optional
@@ -164,10 +165,13 @@ def mark_authenticated(namespace: str, environment: str) -> None:
     from flask import session
     session_key = session_key_for(namespace, environment)
     session_id = _register_session(namespace, environment)
-    session[session_key] = {"ts": _tz_now().isoformat(), "id": session_id}
+    now = time.time()
+    session[session_key] = {"ts": now, "id": session_id}
     session.permanent = True
-    session["last_active"] = _tz_now().isoformat()
-    session["session_created"] = _tz_now().isoformat()
+    session["last_active"] = now
+    session["session_created"] = now
+    # New CSRF seed per login; generate_csrf_token derives tokens from it
+    session["csrf_seed"] = secrets.token_hex(16)
 
 
 def clear_auth(namespace: str, environment: str) -> None:
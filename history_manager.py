@@ -1,37 +1,242 @@
-import json
+import atexit
 import logging
 import os
+import threading
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import BinaryIO, Dict, Any, Iterator, List, Optional, Tuple
 from cryptography.fernet import Fernet
+import orjson
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so history is only safe within one process
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+# Per-environment layout under {data_dir}/{namespace}/{environment}.history/:
+#   manifest.jsonl  one metadata line per snapshot, oldest first
+#   {id}.snap       the full snapshot record, variables encrypted
+HISTORY_DIR_SUFFIX = ".history"
+MANIFEST_NAME = "manifest.jsonl"
+SNAPSHOT_SUFFIX = ".snap"
+# {environment}.history.lock next to the directory: flock target shared by
+# worker processes, held exclusively while the manifest is rewritten
+LOCK_SUFFIX = ".lock"
+
+# Single-file layout used before: every snapshot, blob included, in one
+# JSONL file, plus an offset index. Migrated on first access.
+LEGACY_HISTORY_SUFFIX = ".history.jsonl"
+LEGACY_INDEX_SUFFIX = ".history.idx"
+
+# Append handles kept open between writes; the least recently used is closed first
+MAX_OPEN_HANDLES = 32
+
+
+def _manifest_line(snapshot: Dict[str, Any]) -> bytes:
+    """Serialize a snapshot's metadata, everything except the variables blob."""
+    return orjson.dumps({k: v for k, v in snapshot.items() if k != "variables"}) + b"\n"
+
+
 class HistoryManager:
     """Manages version history for environment variables."""
 
-    def __init__(self, data_dir: str, encryption_key: str):
+    def __init__(self, data_dir: str, encryption_key: str, fernet: Optional[Fernet] = None):
         self.data_dir = Path(data_dir)
-        self.fernet = Fernet(encryption_key.encode())
+        self.fernet = fernet or Fernet(encryption_key.encode())
+        # History directories already created by this manager
+        self._known_dirs: set[Path] = set()
+        self._dirs_lock = threading.Lock()
+        # Open (append handle, inode) pairs for manifest files, keyed by path
+        self._handles: "OrderedDict[str, Tuple[BinaryIO, int]]" = OrderedDict()
+        self._handles_lock = threading.Lock()
+        # (namespace, environment) pairs already checked for legacy history
+        self._migrated: set[Tuple[str, str]] = set()
+        self._migrate_lock = threading.Lock()
+
+    def _get_history_dir(self, namespace: str, environment: str) -> Path:
+        """Get the directory holding the manifest and snapshots of an environment."""
+        return self.data_dir / namespace / f"{environment}{HISTORY_DIR_SUFFIX}"
+
+    def _ensure_dir(self, path: Path) -> None:
+        """Create a history directory unless this manager already did."""
+        if path not in self._known_dirs:
+            with self._dirs_lock:
+                path.mkdir(parents=True, exist_ok=True)
+                self._known_dirs.add(path)
+
+    @contextmanager
+    def _history_lock(self, history_dir: Path, exclusive: bool) -> Iterator[None]:
+        """Hold the cross-process lock of a history directory.
+
+        Appends take it shared; migration takes it exclusively, so no other
+        process writes to a manifest while it is being replaced.
+        """
+        if fcntl is None:
+            yield
+            return
+        # "ab" creates the lock file without truncating it
+        with open(history_dir.with_name(f"{history_dir.name}{LOCK_SUFFIX}"), "ab") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _forget_dir(self, path: Path) -> None:
+        """Make the next _ensure_dir call create path again."""
+        with self._dirs_lock:
+            self._known_dirs.discard(path)
+
+    def forget_environment(self, namespace: str, environment: str) -> None:
+        """Drop what this manager remembers about an environment's files.
+
+        Called when an environment is deleted, so a later save recreates its
+        history directory and rechecks for legacy history.
+        """
+        history_dir = self._get_history_dir(namespace, environment)
+        self._forget_dir(history_dir)
+        self._forget_handle(history_dir / MANIFEST_NAME)
+        with self._migrate_lock:
+            self._migrated.discard((namespace, environment))
+
+    def _append(self, path: Path, data: bytes) -> None:
+        """Append data to path through a cached handle.
+
+        The handle is reopened if the file was removed or replaced since it
+        was opened, so writes never go to an unlinked inode.
+        """
+        key = str(path)
+        with self._handles_lock:
+            try:
+                ino = os.stat(path).st_ino
+            except FileNotFoundError:
+                ino = None
+            cached = self._handles.get(key)
+            if cached is not None and cached[1] != ino:
+                cached[0].close()
+                del self._handles[key]
+                cached = None
+            if cached is None:
+                f = open(path, "ab")
+                cached = self._handles[key] = (f, os.fstat(f.fileno()).st_ino)
+                while len(self._handles) > MAX_OPEN_HANDLES:
+                    self._handles.popitem(last=False)[1][0].close()
+            else:
+                self._handles.move_to_end(key)
+            f = cached[0]
+            f.write(data)
+            # Readers open these files by path, so push every record to the OS
+            f.flush()
+
+    def _forget_handle(self, path: Path) -> None:
+        """Close the cached handle for a file that is about to be replaced."""
+        with self._handles_lock:
+            cached = self._handles.pop(str(path), None)
+            if cached is not None:
+                cached[0].close()
+
+    def close(self) -> None:
+        """Close every cached append handle."""
+        with self._handles_lock:
+            while self._handles:
+                self._handles.popitem()[1][0].close()
+
+    def _write_snapshot_file(self, history_dir: Path, snapshot: Dict[str, Any]) -> None:
+        """Write one snapshot record to its own file."""
+        with open(history_dir / f"{snapshot['id']}{SNAPSHOT_SUFFIX}", "wb") as f:
+            f.write(orjson.dumps(snapshot))
+
+    def _store_snapshot(self, history_dir: Path, snapshot: Dict[str, Any]) -> None:
+        """Write a snapshot file and list it in the manifest."""
+        with self._history_lock(history_dir, exclusive=False):
+            # Snapshot file first, so every manifest entry can be opened
+            self._write_snapshot_file(history_dir, snapshot)
+            self._append(history_dir / MANIFEST_NAME, _manifest_line(snapshot))
+
+    def _migrate_legacy(self, namespace: str, environment: str) -> None:
+        """Split a legacy single-file history into snapshot files and a manifest.
+
+        Runs at most once per environment and process; the legacy files are
+        removed only after the new manifest is in place.
+        """
+        key = (namespace, environment)
+        if key in self._migrated:
+            return
+        with self._migrate_lock:
+            if key in self._migrated:
+                return
+            env_dir = self.data_dir / namespace
+            legacy_file = env_dir / f"{environment}{LEGACY_HISTORY_SUFFIX}"
+            if legacy_file.exists():
+                self.migrate_file(legacy_file, self._get_history_dir(namespace, environment))
+            self._migrated.add(key)
 
-    def _get_history_file(self, namespace: str, environment: str) -> Path:
-        """Get path to history file for a namespace/environment."""
-        env_dir = self.data_dir / namespace
-        env_dir.mkdir(parents=True, exist_ok=True)
-        return env_dir / f"{environment}.history.jsonl"
+    def migrate_file(self, legacy_file: Path, history_dir: Path) -> int:
+        """Move every snapshot of a legacy history file into history_dir.
+
+        Snapshots already listed in an existing manifest are kept after the
+        migrated ones. Returns the number of snapshots migrated, 0 if another
+        process migrated the file first.
+        """
+        # Runs once per environment, so create the directory without the memo
+        history_dir.mkdir(parents=True, exist_ok=True)
+        with self._history_lock(history_dir, exclusive=True):
+            lines: List[bytes] = []
+            seen: set[str] = set()
+            try:
+                f = open(legacy_file, "rb")
+            except FileNotFoundError:
+                return 0
+            with f:
+                for line in f:
+                    try:
+                        snapshot = orjson.loads(line)
+                        snapshot_id = snapshot["id"]
+                        if str(uuid.UUID(snapshot_id)) != snapshot_id:
+                            raise ValueError(snapshot_id)
+                    except (orjson.JSONDecodeError, KeyError, TypeError, ValueError, AttributeError):
+                        continue
+                    self._write_snapshot_file(history_dir, snapshot)
+                    lines.append(_manifest_line(snapshot))
+                    seen.add(snapshot_id)
+
+            manifest_file = history_dir / MANIFEST_NAME
+            try:
+                with open(manifest_file, "rb") as f:
+                    for line in f:
+                        try:
+                            if orjson.loads(line)["id"] in seen:
+                                continue
+                        except (orjson.JSONDecodeError, KeyError, TypeError):
+                            continue
+                        lines.append(line)
+            except FileNotFoundError:
+                pass
+
+            tmp_file = manifest_file.with_name(f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+            with open(tmp_file, "wb") as f:
+                f.writelines(lines)
+            self._forget_handle(manifest_file)
+            os.replace(tmp_file, manifest_file)
+
+            legacy_file.unlink(missing_ok=True)
+            legacy_file.with_name(
+                legacy_file.name.replace(LEGACY_HISTORY_SUFFIX, LEGACY_INDEX_SUFFIX)
+            ).unlink(missing_ok=True)
+        logger.info(f"Migrated {len(seen)} history snapshots from {legacy_file.name}")
+        return len(seen)
 
     def _encrypt_data(self, data: Dict[str, str]) -> str:
         """Encrypt variable data for storage."""
-        json_data = json.dumps(data)
-        return self.fernet.encrypt(json_data.encode()).decode()
+        # Fernet tokens are URL-safe base64, so the ascii codec is enough
+        return self.fernet.encrypt(orjson.dumps(data)).decode("ascii")
 
     def _decrypt_data(self, encrypted_data: str) -> Dict[str, str]:
         """Decrypt variable data from storage."""
         try:
-            json_data = self.fernet.decrypt(encrypted_data.encode()).decode()
-            return json.loads(json_data)
+            return orjson.loads(self.fernet.decrypt(encrypted_data.encode("ascii")))
         except Exception as e:
             logger.error(f"Failed to decrypt history data: {e}")
             return {}
@@ -57,10 +262,17 @@ class HistoryManager:
             "variables": self._encrypt_data(variables)
         }
 
-        history_file = self._get_history_file(namespace, environment)
+        history_dir = self._get_history_dir(namespace, environment)
         try:
-            with open(history_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(snapshot) + "\n")
+            self._migrate_legacy(namespace, environment)
+            self._ensure_dir(history_dir)
+            try:
+                self._store_snapshot(history_dir, snapshot)
+            except FileNotFoundError:
+                # The directory was removed after this manager created it
+                self._forget_dir(history_dir)
+                self._ensure_dir(history_dir)
+                self._store_snapshot(history_dir, snapshot)
             logger.info(f"Saved history snapshot {snapshot_id} for {namespace}/{environment}")
             return snapshot_id
         except Exception as e:
@@ -69,46 +281,70 @@ class HistoryManager:
 
     def get_history(self, namespace: str, environment: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get list of history entries (without full variable data)."""
-        history_file = self._get_history_file(namespace, environment)
-        if not history_file.exists():
-            return []
-
-        history = []
+        history: List[Dict[str, Any]] = []
         try:
-            with open(history_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line.strip())
-                        # Remove heavy variable data for list view
-                        entry.pop("variables", None)
-                        history.append(entry)
-                    except json.JSONDecodeError:
-                        continue
-            
-            # Return most recent first
-            return list(reversed(history))[:limit]
+            self._migrate_legacy(namespace, environment)
+            manifest_file = self._get_history_dir(namespace, environment) / MANIFEST_NAME
+            try:
+                with open(manifest_file, "rb") as f:
+                    lines = f.read().splitlines()
+            except FileNotFoundError:
+                return []
+
+            # Return most recent first, parsing only the lines that are returned
+            for line in reversed(lines):
+                if len(history) >= limit:
+                    break
+                try:
+                    history.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    continue
+            return history
         except Exception as e:
             logger.error(f"Failed to read history: {e}")
             return []
 
     def get_snapshot(self, namespace: str, environment: str, snapshot_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific snapshot with full decrypted variables."""
-        history_file = self._get_history_file(namespace, environment)
-        if not history_file.exists():
+        # The id names a file, so accept canonical UUIDs only
+        try:
+            if str(uuid.UUID(snapshot_id)) != snapshot_id:
+                return None
+        except (TypeError, ValueError, AttributeError):
             return None
 
         try:
-            with open(history_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line.strip())
-                        if entry["id"] == snapshot_id:
-                            # Decrypt variables on demand
-                            entry["variables"] = self._decrypt_data(entry["variables"])
-                            return entry
-                    except json.JSONDecodeError:
-                        continue
+            self._migrate_legacy(namespace, environment)
+            snapshot_file = self._get_history_dir(namespace, environment) / f"{snapshot_id}{SNAPSHOT_SUFFIX}"
+            try:
+                with open(snapshot_file, "rb") as f:
+                    entry = orjson.loads(f.read())
+            except FileNotFoundError:
+                return None
+            # Decrypt variables on demand
+            entry["variables"] = self._decrypt_data(entry["variables"])
+            return entry
         except Exception as e:
             logger.error(f"Failed to read snapshot {snapshot_id}: {e}")
         
         return None
+
+
+_shared_manager: Optional[HistoryManager] = None
+_shared_manager_lock = threading.Lock()
+
+
+def get_history_manager() -> HistoryManager:
+    """Get the process-wide history manager, built on the shared Fernet instance.
+
+    Sharing one manager also shares its open handles and migration state
+    across routes.
+    """
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_manager_lock:
+            if _shared_manager is None:
+                from core.config import settings, fernet
+                _shared_manager = HistoryManager(settings.data_dir, settings.encryption_key, fernet)
+                atexit.register(_shared_manager.close)
+    return _shared_manager
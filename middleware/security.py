@@ -2,6 +2,7 @@
 Security middleware for Secure Environment Manager.
 Handles security headers, CORS, and request preprocessing.
 """
+import time
 from datetime import datetime, timezone
 from typing import Callable
 
@@ -15,7 +16,7 @@ def update_last_seen() -> None:
     """
     from flask import session
     if "last_active" in session:
-        session["last_active"] = _tz_now().isoformat()
+        session["last_active"] = time.time()
 
 
 def add_security_headers(response: Response) -> Response:
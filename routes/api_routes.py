@@ -3,15 +3,13 @@ API routes for Secure Environment Manager.
 All /api/v1/* endpoints for programmatic access.
 """
 import hmac
-import json
-from pathlib import Path
-import os
 import secrets
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict
 
 from flask import Blueprint, jsonify, request
 from werkzeug.security import check_password_hash
+import orjson
 
 from core.auth import (
     extract_bearer_token,
@@ -25,13 +23,17 @@ from core.constants_patch import get_dashboard_password_hash
 from middleware.rate_limiter import is_ip_locked, get_login_failure_count
 from utils.helpers import (
     read_vars,
+    read_vars_many,
     write_vars,
     get_metadata,
     list_all_environments,
     validate_segments,
+    from_env_lines,
+    load_templates,
 )
+from utils.background import submit, drain
 from audit_logger import audit_logger
-from history_manager import HistoryManager
+from history_manager import HistoryManager, get_history_manager
 from analytics_service import analytics_service
 from health_service import health_service
 
@@ -160,37 +162,28 @@ def _token_forbidden_response(
     }), 403
 
 
-# Lazy singleton for history manager
-_history_manager = None
-
-
 def _get_history_manager() -> HistoryManager:
-    """Get or create the history manager singleton."""
-    global _history_manager
-    if _history_manager is None:
-        _history_manager = HistoryManager(settings.data_dir, str(settings.encryption_key))
-    return _history_manager
+    """Get the shared history manager."""
+    return get_history_manager()
 
 
 def _recent_audit_entries(visible_namespaces: set, limit: int = 15) -> list[Dict[str, Any]]:
     """Get recent audit entries for visible namespaces."""
+    audit_logger.flush()
     log_path = audit_logger.log_file
     if not log_path.exists():
         return []
-    lines: list[str] = []
+    lines: list[bytes] = []
     try:
-        with open(log_path, "r", encoding="utf-8") as handle:
+        with open(log_path, "rb") as handle:
             lines = handle.readlines()
     except OSError:
         return []
     picked: list[Dict[str, Any]] = []
     for line in reversed(lines):
-        line = line.strip()
-        if not line:
-            continue
         try:
-            entry = json.loads(line)
-        except json.JSONDecodeError:
+            entry = orjson.loads(line)
+        except orjson.JSONDecodeError:
             continue
         ns = entry.get("namespace")
         if ns not in visible_namespaces:
@@ -316,18 +309,17 @@ def api_meta_stats():
     total_envs = 0
     total_secrets = 0
     last_modified: datetime | None = None
-    for ns in visible:
-        for env in all_envs.get(ns, []):
-            total_envs += 1
-            meta = get_metadata(ns, env)
-            lm = meta.get("last_modified")
-            if isinstance(lm, datetime) and (
-                last_modified is None or lm > last_modified
-            ):
-                last_modified = lm
-            variables = read_vars(ns, env)
-            if "error" not in variables:
-                total_secrets += len(variables)
+    pairs = [(ns, env) for ns in visible for env in all_envs.get(ns, [])]
+    for (ns, env), variables in read_vars_many(pairs).items():
+        total_envs += 1
+        meta = get_metadata(ns, env, variables)
+        lm = meta.get("last_modified")
+        if isinstance(lm, datetime) and (
+            last_modified is None or lm > last_modified
+        ):
+            last_modified = lm
+        if "error" not in variables:
+            total_secrets += len(variables)
     recent = _recent_audit_entries(visible, 12)
     return jsonify(
         {
@@ -356,6 +348,8 @@ def api_meta_analytics():
     except (ValueError, TypeError):
         days = 7
 
+    # The analytics service reads audit.jsonl directly, so write out queued events first
+    audit_logger.flush()
     trends = analytics_service.get_activity_trends(days=days)
     distribution = analytics_service.get_distribution_stats(settings.data_dir)
     summary = analytics_service.get_summary_stats(days=days)
@@ -574,10 +568,11 @@ def api_environment(namespace: str, environment: str):
 
     if request.method == "PUT":
         write_vars(namespace, environment, filtered)
-        _get_history_manager().save_snapshot(
+        submit(
+            _get_history_manager().save_snapshot,
             namespace,
             environment,
-            filtered,
+            dict(filtered),
             "api",
             "BULK_REPLACE",
             f"API PUT replaced {len(filtered)} variables",
@@ -590,34 +585,20 @@ def api_environment(namespace: str, environment: str):
     existing = read_vars(namespace, environment)
     if "error" in existing:
         existing = {}
-    for key, new_value in filtered.items():
-        old_value = existing.get(key, "")
-        is_update = key in existing
-        if is_update:
-            audit_logger.log_variable_update(
-                namespace,
-                environment,
-                key,
-                old_value,
-                new_value,
-                "api",
-                request.remote_addr or "",
-            )
-        else:
-            audit_logger.log_variable_create(
-                namespace,
-                environment,
-                key,
-                new_value,
-                "api",
-                request.remote_addr or "",
-            )
+    audit_logger.log_variable_changes(
+        namespace,
+        environment,
+        [(key, existing.get(key), new_value) for key, new_value in filtered.items()],
+        "api",
+        request.remote_addr or "",
+    )
     existing.update(filtered)
     write_vars(namespace, environment, existing)
-    _get_history_manager().save_snapshot(
+    submit(
+        _get_history_manager().save_snapshot,
         namespace,
         environment,
-        existing,
+        dict(existing),
         "api",
         "UPDATE",
         f"API PATCH updated {len(filtered)} variables",
@@ -636,11 +617,11 @@ def api_environment_meta(namespace: str, environment: str):
     if not api_auth_ok(namespace, token, environment):
         _log_api_auth_failure(namespace, environment, request.remote_addr or "unknown", "invalid_api_key", "environment/meta")
         return _token_forbidden_response(token, requested_namespace=namespace)
-    meta = get_metadata(namespace, environment)
-    lm = meta.get("last_modified")
     variables = read_vars(namespace, environment)
     if "error" in variables:
         return jsonify(variables), 500
+    meta = get_metadata(namespace, environment, variables)
+    lm = meta.get("last_modified")
     return jsonify(
         {
             "last_updated": lm.isoformat() if isinstance(lm, datetime) else None,
@@ -669,10 +650,11 @@ def api_delete_key(namespace: str, environment: str, key: str):
         return jsonify({"error": "Key not found"}), 404
     value = variables.pop(key)
     write_vars(namespace, environment, variables)
-    _get_history_manager().save_snapshot(
+    submit(
+        _get_history_manager().save_snapshot,
         namespace,
         environment,
-        variables,
+        dict(variables),
         "api",
         "DELETE",
         f"Deleted variable '{key}'",
@@ -699,23 +681,17 @@ def api_bulk_replace(namespace: str, environment: str):
     if not api_auth_ok(namespace, token, environment):
         _log_api_auth_failure(namespace, environment, request.remote_addr or "unknown", "invalid_api_key", "environment/bulk")
         return _token_forbidden_response(token, requested_namespace=namespace)
-    body = request.get_json(silent=True)
-    if not isinstance(body, dict):
-        return jsonify({"error": "JSON object required"}), 400
-    payload = str(body.get("payload", "")).strip()
+    if request.mimetype == "text/plain":
+        # Raw .env file upload, as sent by the CLI
+        payload = request.get_data().decode("utf-8", "replace").strip()
+    else:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({"error": "JSON object required"}), 400
+        payload = str(body.get("payload", "")).strip()
     if not payload:
         return jsonify({"error": "payload is required"}), 400
-    result: Dict[str, str] = {}
-    for line in payload.splitlines():
-        if not line or line.strip().startswith("#"):
-            continue
-        if "=" not in line:
-            continue
-        k, v = line.split("=", 1)
-        k = k.strip()
-        if not KEY_PATTERN.match(k):
-            continue
-        result[k] = v.strip()
+    result = from_env_lines(payload)
     if not result:
         return jsonify({"error": "No valid key/value pairs detected"}), 400
     # Merge: read existing and update only matching keys, keep rest
@@ -725,10 +701,11 @@ def api_bulk_replace(namespace: str, environment: str):
     for key, value in result.items():
         existing[key] = value
     write_vars(namespace, environment, existing)
-    _get_history_manager().save_snapshot(
+    submit(
+        _get_history_manager().save_snapshot,
         namespace,
         environment,
-        existing,
+        dict(existing),
         "api",
         "BULK_MERGE",
         f"API bulk merged {len(result)} variables",
@@ -750,6 +727,7 @@ def api_history(namespace: str, environment: str):
     if not api_auth_ok(namespace, token, environment):
         _log_api_auth_failure(namespace, environment, request.remote_addr or "unknown", "invalid_api_key", "environment/history")
         return _token_forbidden_response(token, requested_namespace=namespace)
+    drain()
     history = _get_history_manager().get_history(namespace, environment, limit=80)
     return jsonify({"history": history})
 
@@ -813,12 +791,7 @@ def api_templates_list():
     if not namespaces_visible_to_token(token):
         _log_api_auth_failure("system", "global", request.remote_addr or "unknown", "forbidden_token", "templates")
         return _token_forbidden_response(token)
-    templates_path = Path(__file__).resolve().parent.parent / "templates_config.json"
-    if not os.path.exists(templates_path):
-        return jsonify({"templates": {}})
-    with open(templates_path, "r", encoding="utf-8") as handle:
-        templates = json.load(handle)
-    return jsonify({"templates": templates if isinstance(templates, dict) else {}})
+    return jsonify({"templates": load_templates() or {}})
 
 
 @api_bp.route("/<namespace>/<environment>/templates/apply", methods=["POST"])
@@ -836,11 +809,9 @@ def api_templates_apply(namespace: str, environment: str):
     if not isinstance(body, dict):
         return jsonify({"error": "JSON object required"}), 400
     template_key = str(body.get("template_key", "")).strip()
-    templates_path = Path(__file__).resolve().parent.parent / "templates_config.json"
-    if not os.path.exists(templates_path):
+    templates = load_templates()
+    if templates is None:
         return jsonify({"error": "Templates configuration not found"}), 404
-    with open(templates_path, "r", encoding="utf-8") as handle:
-        templates = json.load(handle)
     if template_key not in templates:
         return jsonify({"error": "Invalid template"}), 400
     template = templates[template_key]
@@ -853,10 +824,11 @@ def api_templates_apply(namespace: str, environment: str):
         current_vars = {}
     current_vars.update(new_vars)
     write_vars(namespace, environment, current_vars)
-    _get_history_manager().save_snapshot(
+    submit(
+        _get_history_manager().save_snapshot,
         namespace,
         environment,
-        current_vars,
+        dict(current_vars),
         "api",
         "APPLY_TEMPLATE",
         f"Applied template: {template['name']}",
@@ -892,14 +864,16 @@ def api_rollback(namespace: str, environment: str):
     snapshot_id = str(body.get("snapshot_id", "")).strip()
     if not snapshot_id:
         return jsonify({"error": "snapshot_id required"}), 400
+    drain()
     snapshot = _get_history_manager().get_snapshot(namespace, environment, snapshot_id)
     if not snapshot:
         return jsonify({"error": "Snapshot not found"}), 404
     write_vars(namespace, environment, snapshot["variables"])
-    _get_history_manager().save_snapshot(
+    submit(
+        _get_history_manager().save_snapshot,
         namespace,
         environment,
-        snapshot["variables"],
+        dict(snapshot["variables"]),
         "api",
         "ROLLBACK",
         f"Rolled back to version from {snapshot['timestamp']}",
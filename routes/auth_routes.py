@@ -2,6 +2,8 @@
 Authentication routes for Secure Environment Manager.
 Handles login, logout, and step-up authentication.
 """
+import time
+
 from flask import (
     Blueprint,
     Response,
@@ -28,7 +30,6 @@ from core.sessions import (
     mark_authenticated,
     clear_auth,
     _invalidate_session,
-    _tz_now,
 )
 from core.step_up_auth import require_step_up_auth
 from middleware.rate_limiter import is_ip_locked, track_failed_login
@@ -325,7 +326,7 @@ def step_up_auth(namespace: str, environment: str):
     if new_session_id:
         from flask import session
         session_key = f"{namespace}:{environment}:authed"
-        session[session_key] = {"ts": _tz_now().isoformat(), "id": new_session_id}
+        session[session_key] = {"ts": time.time(), "id": new_session_id}
 
     audit_logger.log_event(
         "STEP_UP_AUTH_GRANTED", "session", "step_up",
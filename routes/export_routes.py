@@ -2,14 +2,17 @@
 Export routes for Secure Environment Manager.
 Handles downloading environment files in various formats.
 """
-from flask import Blueprint, Response, make_response, request
-import json
-import yaml
+from functools import lru_cache
+from io import BytesIO
+
+from flask import Blueprint, Response, request, send_file
+import orjson
 
 from core.auth import ensure_authenticated
 from core.step_up_auth import require_step_up_auth
 from core.config import settings
 
+from services.export_service import format_as_yaml
 from utils.helpers import read_vars, to_env_lines
 from audit_logger import audit_logger
 
@@ -17,6 +20,29 @@ from audit_logger import audit_logger
 export_bp = Blueprint("export", __name__)
 
 
+@lru_cache(maxsize=256)
+def _export_filename(namespace: str, environment: str) -> str:
+    """Render the configured export filename once per namespace/environment."""
+    return settings.export_filename.format(namespace=namespace, environment=environment)
+
+
+def _attachment(payload: bytes, mimetype: str, filename: str) -> Response:
+    """Send an in-memory export as a download without further copies.
+
+    send_file streams the buffer through the WSGI file wrapper and handles
+    filename quoting; Cache-Control is reset because exports hold secrets.
+    """
+    response = send_file(
+        BytesIO(payload),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=filename,
+        etag=False,
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
 @export_bp.route("/download/<namespace>/<environment>")
 @ensure_authenticated
 @require_step_up_auth
@@ -29,11 +55,8 @@ def download_env(namespace: str, environment: str):
 
     variables = read_vars(namespace, environment)
     content = to_env_lines(variables)
-    filename = settings.export_filename.format(namespace=namespace, environment=environment)
-    response = make_response(content)
-    response.headers.set("Content-Type", "text/plain; charset=utf-8")
-    response.headers.set("Content-Disposition", f"attachment; filename={filename}")
-    return response
+    filename = _export_filename(namespace, environment)
+    return _attachment(content.encode("utf-8"), "text/plain", filename)
 
 
 @export_bp.route("/export/<namespace>/<environment>/json")
@@ -48,10 +71,8 @@ def export_json(namespace: str, environment: str):
 
     variables = read_vars(namespace, environment)
     filename = f"{namespace}-{environment}.json"
-    response = make_response(json.dumps(variables, indent=2))
-    response.headers.set("Content-Type", "application/json; charset=utf-8")
-    response.headers.set("Content-Disposition", f"attachment; filename={filename}")
-    return response
+    payload = orjson.dumps(variables, option=orjson.OPT_INDENT_2)
+    return _attachment(payload, "application/json; charset=utf-8", filename)
 
 
 @export_bp.route("/export/<namespace>/<environment>/yaml")
@@ -66,8 +87,5 @@ def export_yaml(namespace: str, environment: str):
 
     variables = read_vars(namespace, environment)
     filename = f"{namespace}-{environment}.yaml"
-    content = yaml.dump(variables, default_flow_style=False, allow_unicode=True)
-    response = make_response(content)
-    response.headers.set("Content-Type", "application/x-yaml; charset=utf-8")
-    response.headers.set("Content-Disposition", f"attachment; filename={filename}")
-    return response
\ No newline at end of file
+    content = format_as_yaml(variables)
+    return _attachment(content.encode("utf-8"), "application/x-yaml; charset=utf-8", filename)
\ No newline at end of file
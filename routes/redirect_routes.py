@@ -6,10 +6,11 @@ from flask import Blueprint, redirect, request
 
 from core.auth import ensure_authenticated
 from core.step_up_auth import require_step_up_auth
-from core.config import spa_url, settings
-from utils.helpers import read_vars, write_vars
+from core.config import spa_url
+from utils.helpers import read_vars, write_vars, load_templates
+from utils.background import submit, drain
 from audit_logger import audit_logger
-from history_manager import HistoryManager
+from history_manager import get_history_manager
 
 
 redirect_bp = Blueprint("redirect", __name__)
@@ -35,7 +36,8 @@ def compare_version(namespace: str, environment: str, snapshot_id: str):
 @require_step_up_auth
 def rollback_version(namespace: str, environment: str, snapshot_id: str):
     """Rollback to a specific snapshot (web route)."""
-    history_manager = HistoryManager(settings.data_dir, str(settings.encryption_key))
+    history_manager = get_history_manager()
+    drain()
     snapshot = history_manager.get_snapshot(namespace, environment, snapshot_id)
     if not snapshot:
         return redirect(spa_url(namespace, environment, "history"))
@@ -44,8 +46,9 @@ def rollback_version(namespace: str, environment: str, snapshot_id: str):
     write_vars(namespace, environment, snapshot["variables"])
 
     # Log the rollback
-    history_manager.save_snapshot(
-        namespace, environment, snapshot["variables"], "session",
+    submit(
+        history_manager.save_snapshot,
+        namespace, environment, dict(snapshot["variables"]), "session",
         "ROLLBACK", f"Rolled back to version from {snapshot['timestamp']}"
     )
 
@@ -75,21 +78,12 @@ def view_templates(namespace: str, environment: str):
 @ensure_authenticated
 def apply_template(namespace: str, environment: str):
     """Apply a template to the current environment."""
-    import json
-    import os
     import secrets
-    from history_manager import HistoryManager
 
     template_key = request.form.get("template_key")
 
-    templates_path = os.path.join(os.path.dirname(__file__), "..", "..", "templates_config.json")
-    if not os.path.exists(templates_path):
-        return redirect(spa_url(namespace, environment, "templates"))
-
-    with open(templates_path, "r") as f:
-        templates = json.load(f)
-
-    if template_key not in templates:
+    templates = load_templates()
+    if not templates or template_key not in templates:
         return redirect(spa_url(namespace, environment, "templates"))
 
     template = templates[template_key]
@@ -109,9 +103,10 @@ def apply_template(namespace: str, environment: str):
 
     write_vars(namespace, environment, current_vars)
 
-    history_manager = HistoryManager(settings.data_dir, str(settings.encryption_key))
-    history_manager.save_snapshot(
-        namespace, environment, current_vars, "session",
+    history_manager = get_history_manager()
+    submit(
+        history_manager.save_snapshot,
+        namespace, environment, dict(current_vars), "session",
         "APPLY_TEMPLATE", f"Applied template: {template['name']}"
     )
 
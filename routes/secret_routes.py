@@ -8,10 +8,10 @@ from core.auth import ensure_authenticated
 from core.step_up_auth import require_step_up_auth
 from core.sessions import current_identity
 
-from utils.helpers import read_vars, write_vars
+from utils.helpers import read_vars, write_vars, from_env_lines
+from utils.background import submit, drain
 from audit_logger import audit_logger
-from history_manager import HistoryManager
-from core.config import settings
+from history_manager import HistoryManager, get_history_manager
 
 
 secret_bp = Blueprint("secret", __name__)
@@ -28,17 +28,17 @@ def add_variable(namespace: str, environment: str):
         return redirect(_spa_url(namespace, environment))
 
     # Check if update or create
-    current_vars = read_vars(namespace, environment)
-    is_update = key in current_vars
-    old_value = current_vars.get(key, "")
-
     variables = read_vars(namespace, environment)
+    is_update = key in variables
+    old_value = variables.get(key, "")
+
     variables[key] = value
     write_vars(namespace, environment, variables)
 
     # Save History Snapshot
-    _get_history_manager().save_snapshot(
-        namespace, environment, variables, "session",
+    submit(
+        _get_history_manager().save_snapshot,
+        namespace, environment, dict(variables), "session",
         "UPDATE" if is_update else "CREATE",
         f"{'Updated' if is_update else 'Created'} variable '{key}'"
     )
@@ -63,17 +63,17 @@ def add_variable(namespace: str, environment: str):
 def delete_variable(namespace: str, environment: str, key: str):
     """Delete a variable from the environment."""
     # Get value for log before deleting
-    current_vars = read_vars(namespace, environment)
-    value = current_vars.get(key, "")
-
     variables = read_vars(namespace, environment)
+    value = variables.get(key, "")
+
     if key in variables:
         variables.pop(key)
         write_vars(namespace, environment, variables)
 
         # Save History Snapshot
-        _get_history_manager().save_snapshot(
-            namespace, environment, variables, "session",
+        submit(
+            _get_history_manager().save_snapshot,
+            namespace, environment, dict(variables), "session",
             "DELETE", f"Deleted variable '{key}'"
         )
 
@@ -92,23 +92,12 @@ def delete_variable(namespace: str, environment: str, key: str):
 def bulk_replace(namespace: str, environment: str):
     """Merge the environment with pasted .env payload (non-destructive)."""
     from core.auth import validate_csrf
-    from core.constants import KEY_PATTERN
 
     validate_csrf()
     payload = request.form.get("bulk_payload", "").strip()
     if not payload:
         return redirect(_spa_url(namespace, environment))
-    result: dict = {}
-    for line in payload.splitlines():
-        if not line or line.strip().startswith("#"):
-            continue
-        if "=" not in line:
-            continue
-        key, value = line.split("=", 1)
-        key = key.strip()
-        if not KEY_PATTERN.match(key):
-            continue
-        result[key] = value.strip()
+    result = from_env_lines(payload)
     if not result:
         pass
     else:
@@ -121,8 +110,9 @@ def bulk_replace(namespace: str, environment: str):
         write_vars(namespace, environment, existing)
 
         # Save History Snapshot
-        _get_history_manager().save_snapshot(
-            namespace, environment, existing, "session",
+        submit(
+            _get_history_manager().save_snapshot,
+            namespace, environment, dict(existing), "session",
             "BULK_MERGE", f"Bulk merged {len(result)} variables"
         )
 
@@ -134,7 +124,9 @@ def bulk_replace(namespace: str, environment: str):
 @require_step_up_auth
 def rollback_version(namespace: str, environment: str, snapshot_id: str):
     """Rollback to a specific snapshot"""
-    snapshot = _get_history_manager().get_snapshot(namespace, environment, snapshot_id)
+    history_manager = _get_history_manager()
+    drain()
+    snapshot = history_manager.get_snapshot(namespace, environment, snapshot_id)
     if not snapshot:
         return redirect(_spa_url(namespace, environment, "history"))
 
@@ -142,8 +134,9 @@ def rollback_version(namespace: str, environment: str, snapshot_id: str):
     write_vars(namespace, environment, snapshot["variables"])
 
     # Log the rollback
-    _get_history_manager().save_snapshot(
-        namespace, environment, snapshot["variables"], "session",
+    submit(
+        history_manager.save_snapshot,
+        namespace, environment, dict(snapshot["variables"]), "session",
         "ROLLBACK", f"Rolled back to version from {snapshot['timestamp']}"
     )
 
@@ -161,13 +154,6 @@ def _spa_url(namespace: str, environment: str, *extra: str) -> str:
     return _spa_url_func(namespace, environment, *extra)
 
 
-# Lazy singleton for history manager
-_history_manager = None
-
-
 def _get_history_manager() -> HistoryManager:
-    """Get or create the history manager singleton."""
-    global _history_manager
-    if _history_manager is None:
-        _history_manager = HistoryManager(settings.data_dir, str(settings.encryption_key))
-    return _history_manager
\ No newline at end of file
+    """Get the shared history manager."""
+    return get_history_manager()
\ No newline at end of file
@@ -10,13 +10,26 @@ import json
 import argparse
 import requests
 from getpass import getpass
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict, Any
 from urllib.parse import urljoin
+from urllib3.util.retry import Retry
+
+# Exports are copied to the destination in blocks of this size
+EXPORT_CHUNK_BYTES = 64 * 1024
 
 class DotenvCLI:
     def __init__(self, base_url: str = "http://localhost:8070"):
         self.base_url = base_url
         self.session = requests.Session()
+        # Keep connections alive across calls; idempotent requests retry on connection errors
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=2, backoff_factor=0.1),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
     def login(self, namespace: str, environment: str, password: str) -> bool:
         """Authenticate with the server"""
@@ -49,24 +62,35 @@ class DotenvCLI:
         response = self.session.delete(url)
         return response.status_code == 200
     
-    def export_env(self, namespace: str, environment: str, format: str = "env") -> str:
-        """Export environment variables"""
+    def export_env(self, namespace: str, environment: str, format: str = "env", output: Optional[str] = None) -> bool:
+        """Export environment variables, streaming them to a file or stdout"""
         if format == "env":
             url = urljoin(self.base_url, f"/download/{namespace}/{environment}")
         else:
             url = urljoin(self.base_url, f"/export/{namespace}/{environment}/{format}")
-        response = self.session.get(url)
-        if response.status_code == 200:
-            return response.text
-        return ""
+        with self.session.get(url, stream=True) as response:
+            if response.status_code != 200:
+                return False
+            if output:
+                with open(output, 'wb') as f:
+                    for chunk in response.iter_content(EXPORT_CHUNK_BYTES):
+                        f.write(chunk)
+            else:
+                for chunk in response.iter_content(EXPORT_CHUNK_BYTES):
+                    sys.stdout.buffer.write(chunk)
+                sys.stdout.buffer.write(b"\n")
+                sys.stdout.flush()
+        return True
     
     def import_env(self, namespace: str, environment: str, file_path: str) -> bool:
         """Import environment variables from file"""
-        with open(file_path, 'r') as f:
+        with open(file_path, 'rb') as f:
             content = f.read()
         
         url = urljoin(self.base_url, f"/api/v1/{namespace}/{environment}/bulk")
-        response = self.session.post(url, json={"payload": content})
+        response = self.session.post(
+            url, data=content, headers={"Content-Type": "text/plain; charset=utf-8"}
+        )
         return response.status_code == 200
 
 def main():
@@ -151,14 +175,9 @@ def main():
                 sys.exit(1)
         
         elif args.command == "export":
-            content = cli.export_env(args.namespace, args.environment, args.format)
-            if content:
+            if cli.export_env(args.namespace, args.environment, args.format, args.output):
                 if args.output:
-                    with open(args.output, 'w') as f:
-                        f.write(content)
                     print(f"✅ Exported to {args.output}")
-                else:
-                    print(content)
             else:
                 print(f"❌ Failed to export", file=sys.stderr)
                 sys.exit(1)
@@ -4,21 +4,41 @@ Email Backup Service
 Automatically sends encrypted backup of data directory via email
 """
 
+import base64
 import os
+import re
 import sys
 import smtplib
+import tarfile
+import uuid
 import zipfile
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
-from email import encoders
+from email.policy import SMTP as SMTP_POLICY
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Attachment read size: a whole number of 57-byte groups, so every chunk
+# encodes to complete 76-character base64 lines (~64 KiB per read)
+ATTACHMENT_CHUNK_BYTES = 57 * 1150
+
+# Environment files are AES-GCM ciphertext, which deflate cannot shrink
+INCOMPRESSIBLE_SUFFIXES = {'.enc'}
+
+# Archive formats selectable with BACKUP_FORMAT; tar.zst needs `zstandard`
+BACKUP_FORMATS = ('zip', 'tar.zst')
+ZSTD_LEVEL = 3
+
+# BDAT chunk size when the server accepts raw binary bodies (CHUNKING + BINARYMIME)
+BDAT_CHUNK_BYTES = 1024 * 1024
+
+# SMTP transparency: lines starting with "." are sent with an extra "."
+_LEADING_DOT = re.compile(rb'(?m)^\.')
+
 class EmailBackupService:
     def __init__(self):
         # Email configuration from environment variables
@@ -31,15 +51,70 @@ class EmailBackupService:
         # Backup configuration
         self.data_dir = os.getenv('DATA_DIR', './data')
         self.backup_dir = os.getenv('BACKUP_DIR', './backups')
+        self.backup_format = os.getenv('BACKUP_FORMAT', 'zip').lower()
+        if self.backup_format not in BACKUP_FORMATS:
+            raise ValueError(f"Unsupported BACKUP_FORMAT '{self.backup_format}'. Use one of: {', '.join(BACKUP_FORMATS)}")
         
         # Validate configuration
         if not all([self.sender_email, self.sender_password, self.recipient_email]):
             raise ValueError("Missing email configuration. Please set SENDER_EMAIL, SENDER_PASSWORD, and BACKUP_EMAIL in .env")
     
+    def _backup_members(self):
+        """Yield (path, arcname, label) for every file that goes into a backup"""
+        # Add data directory
+        data_path = Path(self.data_dir)
+        if data_path.exists():
+            for file_path in data_path.rglob('*'):
+                if file_path.is_file():
+                    arcname = file_path.relative_to(data_path.parent)
+                    yield file_path, str(arcname), str(arcname)
+
+        # Add .env file (contains encryption key - CRITICAL!)
+        env_file = Path('.env')
+        if env_file.exists():
+            yield env_file, '.env', '.env (encryption key)'
+
+        # Add audit logs if they exist
+        audit_dir = Path('audit_logs')
+        if audit_dir.exists():
+            for file_path in audit_dir.rglob('*.jsonl'):
+                if file_path.is_file():
+                    arcname = file_path.relative_to('.')
+                    yield file_path, str(arcname), str(arcname)
+
+        # Add templates config
+        templates_file = Path('templates_config.json')
+        if templates_file.exists():
+            yield templates_file, 'templates_config.json', 'templates_config.json'
+
+    def _write_zip(self, backup_path: str):
+        """Write backup members into a deflated zip archive"""
+        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for file_path, arcname, label in self._backup_members():
+                if file_path.suffix in INCOMPRESSIBLE_SUFFIXES:
+                    zipf.write(file_path, arcname, compress_type=zipfile.ZIP_STORED)
+                else:
+                    zipf.write(file_path, arcname)
+                print(f"  ✓ Added: {label}")
+
+    def _write_tar_zst(self, backup_path: str):
+        """Write backup members into a tar stream compressed by multi-threaded zstd"""
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("BACKUP_FORMAT=tar.zst requires the 'zstandard' package (pip install zstandard)")
+
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+        with open(backup_path, 'wb') as raw, compressor.stream_writer(raw) as zst:
+            with tarfile.open(fileobj=zst, mode='w|') as tar:
+                for file_path, arcname, label in self._backup_members():
+                    tar.add(file_path, arcname)
+                    print(f"  ✓ Added: {label}")
+
     def create_backup_zip(self) -> str:
-        """Create a zip file of the data directory"""
+        """Create an archive of the data directory in the configured BACKUP_FORMAT"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_filename = f"dotenv_backup_{timestamp}.zip"
+        backup_filename = f"dotenv_backup_{timestamp}.{self.backup_format}"
         backup_path = os.path.join(self.backup_dir, backup_filename)
         
         # Create backup directory if it doesn't exist
@@ -47,37 +122,10 @@ class EmailBackupService:
         
         print(f"📦 Creating backup: {backup_filename}")
         
-        # Create zip file
-        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add data directory
-            data_path = Path(self.data_dir)
-            if data_path.exists():
-                for file_path in data_path.rglob('*'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(data_path.parent)
-                        zipf.write(file_path, arcname)
-                        print(f"  ✓ Added: {arcname}")
-            
-            # Add .env file (contains encryption key - CRITICAL!)
-            env_file = Path('.env')
-            if env_file.exists():
-                zipf.write(env_file, '.env')
-                print(f"  ✓ Added: .env (encryption key)")
-            
-            # Add audit logs if they exist
-            audit_dir = Path('audit_logs')
-            if audit_dir.exists():
-                for file_path in audit_dir.rglob('*.jsonl'):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to('.')
-                        zipf.write(file_path, arcname)
-                        print(f"  ✓ Added: {arcname}")
-            
-            # Add templates config
-            templates_file = Path('templates_config.json')
-            if templates_file.exists():
-                zipf.write(templates_file, 'templates_config.json')
-                print(f"  ✓ Added: templates_config.json")
+        if self.backup_format == 'tar.zst':
+            self._write_tar_zst(backup_path)
+        else:
+            self._write_zip(backup_path)
         
         # Get file size
         file_size = os.path.getsize(backup_path)
@@ -86,17 +134,24 @@ class EmailBackupService:
         
         return backup_path
     
-    def send_email_with_attachment(self, attachment_path: str) -> bool:
-        """Send email with backup attachment"""
-        try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = self.recipient_email
-            msg['Subject'] = f"Dotenv Server Backup - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            
-            # Email body
-            body = f"""
+    def _build_message_head(self, attachment_path: str, boundary: str, transfer_encoding: str = 'base64') -> bytes:
+        """Render headers, text body and attachment part headers as SMTP bytes.
+
+        The attachment body itself is streamed separately, followed by the
+        closing boundary.
+        """
+        msg = MIMEMultipart(boundary=boundary)
+        msg['From'] = self.sender_email
+        msg['To'] = self.recipient_email
+        msg['Subject'] = f"Dotenv Server Backup ({self.backup_format}) - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+
+        if self.backup_format == 'zip':
+            extract_step = "Extract the zip file"
+        else:
+            extract_step = f"Extract the archive: tar --zstd -xf {os.path.basename(attachment_path)}"
+
+        # Email body
+        body = f"""
 Automated Backup Report
 =======================
 
@@ -114,7 +169,7 @@ This backup contains:
 the data cannot be decrypted.
 
 To restore from this backup:
-1. Extract the zip file
+1. {extract_step}
 2. Copy data/ directory to your server
 3. Copy .env file to your server root
 4. Restart the server
@@ -122,31 +177,89 @@ To restore from this backup:
 ---
 Dotenv Server Automated Backup Service
 """
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Attach backup file
-            print(f"📎 Attaching backup file...")
-            with open(attachment_path, 'rb') as f:
-                part = MIMEBase('application', 'zip')
-                part.set_payload(f.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename={os.path.basename(attachment_path)}'
-                )
-                msg.attach(part)
-            
+
+        msg.attach(MIMEText(body, 'plain'))
+
+        rendered = msg.as_bytes(policy=SMTP_POLICY)
+        head = rendered[:rendered.rindex(f"--{boundary}--".encode())]
+        part_headers = (
+            f"--{boundary}\r\n"
+            f"Content-Type: {'application/zip' if self.backup_format == 'zip' else 'application/zstd'}\r\n"
+            "MIME-Version: 1.0\r\n"
+            f"Content-Transfer-Encoding: {transfer_encoding}\r\n"
+            f"Content-Disposition: attachment; filename={os.path.basename(attachment_path)}\r\n"
+            "\r\n"
+        )
+        return head + part_headers.encode()
+
+    @staticmethod
+    def _bdat(server: smtplib.SMTP, payload: bytes, last: bool = False):
+        """Send one BDAT chunk and check the server accepted it"""
+        server.send(f"BDAT {len(payload)}{' LAST' if last else ''}\r\n".encode() + payload)
+        code, resp = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+
+    def _send_binary(self, server: smtplib.SMTP, attachment_path: str, boundary: str):
+        """Send the message with BDAT, attaching the archive as raw bytes"""
+        self._bdat(server, self._build_message_head(attachment_path, boundary, 'binary'))
+        print(f"📎 Streaming backup file (binary)...")
+        with open(attachment_path, 'rb') as f:
+            while chunk := f.read(BDAT_CHUNK_BYTES):
+                self._bdat(server, chunk)
+        self._bdat(server, f"\r\n--{boundary}--\r\n".encode(), last=True)
+
+    def _send_base64(self, server: smtplib.SMTP, attachment_path: str, boundary: str):
+        """Send the message with DATA, base64-encoding the archive chunk by chunk"""
+        code, resp = server.docmd("DATA")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, resp)
+
+        server.send(_LEADING_DOT.sub(b'..', self._build_message_head(attachment_path, boundary)))
+        print(f"📎 Streaming backup file...")
+        with open(attachment_path, 'rb') as f:
+            while chunk := f.read(ATTACHMENT_CHUNK_BYTES):
+                server.send(base64.encodebytes(chunk).replace(b"\n", b"\r\n"))
+        server.send(f"\r\n--{boundary}--\r\n.\r\n".encode())
+
+        code, resp = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+
+    def send_email_with_attachment(self, attachment_path: str) -> bool:
+        """Send email with backup attachment.
+
+        Servers advertising CHUNKING and BINARYMIME receive the archive as
+        raw bytes over BDAT. Otherwise it is base64-encoded chunk by chunk
+        straight onto the DATA stream. Either way memory use does not grow
+        with the backup size.
+        """
+        try:
+            boundary = f"==============={uuid.uuid4().hex}=="
+
             # Send email
             print(f"📧 Sending email to {self.recipient_email}...")
             with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
                 server.starttls()
                 server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-            
+                server.ehlo_or_helo_if_needed()
+                binary = server.has_extn('chunking') and server.has_extn('binarymime')
+
+                code, resp = server.mail(self.sender_email, ['BODY=BINARYMIME'] if binary else [])
+                if code != 250:
+                    raise smtplib.SMTPSenderRefused(code, resp, self.sender_email)
+                code, resp = server.rcpt(self.recipient_email)
+                if code not in (250, 251):
+                    raise smtplib.SMTPRecipientsRefused({self.recipient_email: (code, resp)})
+
+                if binary:
+                    self._send_binary(server, attachment_path, boundary)
+                else:
+                    self._send_base64(server, attachment_path, boundary)
+
             print(f"✅ Email sent successfully!")
             return True
-            
+
         except Exception as e:
             print(f"❌ Failed to send email: {e}")
             return False
@@ -160,15 +273,22 @@ Dotenv Server Automated Backup Service
         current_time = datetime.now().timestamp()
         removed_count = 0
         
-        for filename in os.listdir(self.backup_dir):
-            if filename.endswith('.zip'):
-                file_path = os.path.join(self.backup_dir, filename)
-                file_age_days = (current_time - os.path.getmtime(file_path)) / 86400
-                
-                if file_age_days > keep_days:
-                    os.remove(file_path)
-                    print(f"  ✓ Removed: {filename} ({file_age_days:.1f} days old)")
-                    removed_count += 1
+        # scandir caches one stat per entry; oldest first, so stop at the first keeper
+        with os.scandir(self.backup_dir) as it:
+            backups = [
+                (entry.stat().st_mtime, entry)
+                for entry in it
+                if entry.name.endswith(('.zip', '.tar.zst')) and entry.is_file()
+            ]
+        backups.sort(key=lambda item: item[0])
+        
+        for mtime, entry in backups:
+            file_age_days = (current_time - mtime) / 86400
+            if file_age_days <= keep_days:
+                break
+            os.remove(entry.path)
+            print(f"  ✓ Removed: {entry.name} ({file_age_days:.1f} days old)")
+            removed_count += 1
         
         if removed_count > 0:
             print(f"✅ Removed {removed_count} old backup(s)")
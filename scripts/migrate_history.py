@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+History Migration
+Splits legacy data/<namespace>/<environment>.history.jsonl files into the
+per-snapshot layout (data/<namespace>/<environment>.history/). The server
+also migrates lazily on first access; run this to do it all up front.
+"""
+
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from history_manager import HistoryManager, HISTORY_DIR_SUFFIX, LEGACY_HISTORY_SUFFIX
+
+# Load environment variables
+load_dotenv()
+
+
+def main():
+    data_dir = Path(os.getenv('DATA_DIR', './data'))
+    encryption_key = os.getenv('ENCRYPTION_KEY')
+    if not encryption_key:
+        print("❌ Error: ENCRYPTION_KEY is not set")
+        sys.exit(1)
+
+    manager = HistoryManager(str(data_dir), encryption_key)
+    legacy_files = sorted(data_dir.glob(f"*/*{LEGACY_HISTORY_SUFFIX}"))
+    if not legacy_files:
+        print("✓ No legacy history files to migrate")
+        return
+
+    print(f"📦 Migrating {len(legacy_files)} history file(s) in {data_dir}")
+    failed = 0
+    for legacy_file in legacy_files:
+        environment = legacy_file.name[:-len(LEGACY_HISTORY_SUFFIX)]
+        history_dir = legacy_file.with_name(f"{environment}{HISTORY_DIR_SUFFIX}")
+        try:
+            count = manager.migrate_file(legacy_file, history_dir)
+            print(f"  ✓ {legacy_file.parent.name}/{environment}: {count} snapshot(s)")
+        except Exception as e:
+            print(f"  ❌ {legacy_file.parent.name}/{environment}: {e}")
+            failed += 1
+    manager.close()
+
+    if failed:
+        print(f"⚠️ {failed} file(s) failed to migrate")
+        sys.exit(1)
+    print("✅ Migration complete")
+
+
+if __name__ == "__main__":
+    main()
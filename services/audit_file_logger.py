@@ -4,26 +4,87 @@ Low-level file operations for audit logging.
 Handles append-only writes with automatic rotation.
 """
 
-import json
+import atexit
+import itertools
 import logging
 import os
+import queue
+import time
+from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 import threading
 
+import orjson
+
 from services.audit_constants import MAX_LOG_FILE_SIZE_BYTES, MAX_ROTATED_FILES
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on lines coalesced into one write
+MAX_BATCH_ENTRIES = 256
+
+# Block size for reading the log backwards from the end
+TAIL_CHUNK_BYTES = 64 * 1024
+
+# Most recent lines kept in memory to serve newest-first reads
+RECENT_ENTRIES = 2048
+
+
+# (epoch second, "YYYY-MM-DDTHH:MM:SS") of the last timestamp formatted;
+# events within the same second only format their microseconds
+_TIMESTAMP_PREFIX: tuple[int, str] = (-1, "")
+
+
+def utc_timestamp() -> str:
+    """Get current UTC timestamp in ISO format, always with microseconds."""
+    global _TIMESTAMP_PREFIX
+    seconds, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    cached_seconds, prefix = _TIMESTAMP_PREFIX
+    if seconds != cached_seconds:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+        _TIMESTAMP_PREFIX = (seconds, prefix)
+    return f"{prefix}.{micros:06d}+00:00"
+
+
+def _iter_lines_reversed(f, chunk_size: int = TAIL_CHUNK_BYTES):
+    """Yield the non-empty lines of a binary file from last to first.
+
+    Reads fixed-size blocks backwards from the end, carrying the partial
+    first line of each block over to the block before it.
+    """
+    pos = os.fstat(f.fileno()).st_size
+    leftover = b''
+    while pos > 0:
+        step = min(chunk_size, pos)
+        pos -= step
+        f.seek(pos)
+        lines = (f.read(step) + leftover).split(b'\n')
+        leftover = lines[0]
+        for line in reversed(lines[1:]):
+            if line:
+                yield line
+    if leftover:
+        yield leftover
+
+
+def _containing(lines, needle: bytes):
+    """Yield only the lines that contain needle."""
+    for line in lines:
+        if needle in line:
+            yield line
+
 
 class AuditFileLogger:
     """Handles low-level file I/O for audit logs.
 
     Provides:
-    - Append-only writes with write lock
+    - Append-only writes batched by a background flusher thread
     - Automatic rotation when file exceeds size limit
     - Cleanup of old rotated files
+    - In-memory ring of the latest lines, trusted only while the file size
+      matches what this instance last wrote or read
     """
 
     def __init__(self, log_dir: str = "audit_logs", log_file_name: str = "audit.jsonl"):
@@ -31,10 +92,22 @@ class AuditFileLogger:
         self.log_dir.mkdir(exist_ok=True)
         self.log_file = self.log_dir / log_file_name
         self._write_lock = threading.Lock()
+        # Serialized lines, and flush() markers set once the lines ahead are written
+        self._pending: queue.Queue[bytes | threading.Event] = queue.Queue()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_lock = threading.Lock()
+        # Guarded by _write_lock; _recent_size is None when the ring is stale
+        self._recent: deque[bytes] = deque(maxlen=RECENT_ENTRIES)
+        self._recent_size: Optional[int] = None
+        self._recent_complete = False
+        # Append handle kept open between batches, and the inode it points at
+        self._fh = None
+        self._fh_ino: Optional[int] = None
+        atexit.register(self.close)
 
     def _get_timestamp(self) -> str:
         """Get current UTC timestamp in ISO format."""
-        return datetime.now(timezone.utc).isoformat()
+        return utc_timestamp()
 
     def _rotate_if_needed(self):
         """Rotate log file if it exceeds MAX_LOG_FILE_SIZE_BYTES.
@@ -56,6 +129,7 @@ class AuditFileLogger:
             rotated_path = self.log_dir / rotated_name
 
             # Atomic rotate: rename current file to rotated path
+            self._close_handle()
             os.replace(self.log_file, rotated_path)
 
             # Create fresh empty log file for new writes
@@ -83,16 +157,146 @@ class AuditFileLogger:
         except Exception as e:
             logger.error(f"Failed to cleanup old rotated logs: {e}")
 
-    def write_entry(self, log_entry: dict):
-        """Write log entry to file, rotating if necessary."""
+    def _ensure_flusher(self):
+        """Start the flusher thread on first use."""
+        if self._flusher is None:
+            with self._flusher_lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._run_flusher, name="audit-flusher", daemon=True
+                    )
+                    self._flusher.start()
+
+    def _run_flusher(self):
+        """Append queued lines in batches: everything pending, up to MAX_BATCH_ENTRIES."""
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < MAX_BATCH_ENTRIES:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            lines = [item for item in batch if isinstance(item, bytes)]
+            try:
+                if lines:
+                    self._write_batch(lines)
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+
+    def _log_handle(self):
+        """Return the open append handle, reopening it if log_file was replaced.
+
+        Must be called with _write_lock held.
+        """
+        try:
+            ino = os.stat(self.log_file).st_ino
+        except FileNotFoundError:
+            ino = None
+        if self._fh is not None and ino != self._fh_ino:
+            # Rotated or removed by another process: stop writing to the old file
+            self._close_handle()
+        if self._fh is None:
+            self._fh = open(self.log_file, 'ab', buffering=1 << 16)
+            self._fh_ino = os.fstat(self._fh.fileno()).st_ino
+        return self._fh
+
+    def _close_handle(self):
+        """Close the append handle, if open. Must be called with _write_lock held."""
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+                self._fh_ino = None
+
+    def _write_batch(self, lines: list[bytes]):
+        """Append serialized lines with a single write, rotating if necessary."""
         try:
             with self._write_lock:
                 self._rotate_if_needed()
-                with open(self.log_file, 'a', encoding='utf-8') as f:
-                    f.write(json.dumps(log_entry) + '\n')
+                payload = b''.join(lines)
+                f = self._log_handle()
+                start = f.seek(0, os.SEEK_END)
+                f.write(payload)
+                # Readers open the file by path, so push each batch to the OS
+                f.flush()
+                self._track_appended(start, lines, start + len(payload))
         except Exception as e:
             logger.error(f"Failed to write audit log: {e}")
 
+    def _track_appended(self, start: int, lines: list[bytes], end: int):
+        """Extend the recent-lines ring if it mirrored the file up to `start`.
+
+        Any other writer (another process, or a rotation) leaves the size
+        out of step, which marks the ring stale until the next read reloads it.
+        """
+        if self._recent_size != start:
+            self._recent_size = None
+            return
+        if len(self._recent) + len(lines) > RECENT_ENTRIES:
+            self._recent_complete = False
+        self._recent.extend(lines)
+        self._recent_size = end
+
+    def _recent_lines(self) -> Optional[tuple[list[bytes], bool]]:
+        """Return (lines newest first, whether they cover the whole file)."""
+        with self._write_lock:
+            try:
+                size = os.stat(self.log_file).st_size
+            except FileNotFoundError:
+                return None
+            if size != self._recent_size:
+                with open(self.log_file, 'rb') as f:
+                    tail = list(itertools.islice(_iter_lines_reversed(f), RECENT_ENTRIES + 1))
+                self._recent.clear()
+                self._recent.extend(reversed(tail[:RECENT_ENTRIES]))
+                self._recent_complete = len(tail) <= RECENT_ENTRIES
+                self._recent_size = size
+            return list(reversed(self._recent)), self._recent_complete
+
+    def write_entry(self, log_entry: dict):
+        """Queue a log entry for the flusher thread."""
+        try:
+            line = orjson.dumps(log_entry) + b'\n'
+        except TypeError as e:
+            logger.error(f"Failed to serialize audit log entry: {e}")
+            return
+        self._ensure_flusher()
+        self._pending.put(line)
+
+    def write_entries(self, log_entries: list[dict]):
+        """Queue several log entries at once; the flusher appends them together."""
+        lines = []
+        for log_entry in log_entries:
+            try:
+                lines.append(orjson.dumps(log_entry) + b'\n')
+            except TypeError as e:
+                logger.error(f"Failed to serialize audit log entry: {e}")
+        if not lines:
+            return
+        self._ensure_flusher()
+        for line in lines:
+            self._pending.put(line)
+
+    def flush(self):
+        """Block until every entry queued before this call has been written to disk.
+
+        Entries queued while waiting are left to the flusher, so readers are
+        not held up by a burst of concurrent writes.
+        """
+        if self._flusher is not None:
+            done = threading.Event()
+            self._pending.put(done)
+            done.wait()
+
+    def close(self):
+        """Write out queued entries and close the append handle."""
+        self.flush()
+        with self._write_lock:
+            self._close_handle()
+
     def read_entries(
         self,
         offset: int,
@@ -103,57 +307,96 @@ class AuditFileLogger:
         user_id: Optional[str] = None,
         ip_address: Optional[str] = None,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        newest_first: bool = False
     ):
         """Read JSONL entries with efficient offset-based skipping.
 
         Uses a line-based iterator to avoid loading the entire file into memory.
         Skips `offset` entries first, then yields up to `limit` matching entries.
+        With `newest_first`, pages are served from the in-memory ring when it
+        can fill them, and otherwise by reading the file backwards from the end.
         """
-        if not self.log_file.exists():
-            return
+        self.flush()
+        filters = (namespace, environment, action, user_id, ip_address, start_date, end_date)
 
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                skipped = 0
-                yielded = 0
-
-                for line in f:
-                    try:
-                        log_entry = json.loads(line.strip())
-                    except json.JSONDecodeError:
-                        continue
-
-                    # Apply filters first
-                    if namespace and log_entry.get('namespace') != namespace:
-                        continue
-                    if environment and log_entry.get('environment') != environment:
-                        continue
-                    if action and log_entry.get('action') != action:
-                        continue
-                    if user_id and log_entry.get('user_id') != user_id:
-                        continue
-                    if ip_address and log_entry.get('ip_address') != ip_address:
-                        continue
-
-                    # Date range filter
-                    if start_date or end_date:
-                        ts = log_entry.get('timestamp', '')
-                        if start_date and ts < start_date:
-                            continue
-                        if end_date and ts > end_date:
-                            continue
-
-                    # Only count matching entries toward offset
-                    if skipped < offset:
-                        skipped += 1
-                        continue
-
-                    if yielded >= limit:
-                        break
-
-                    yielded += 1
-                    yield log_entry
+            if newest_first:
+                recent = self._recent_lines()
+                if recent is None:
+                    return
+                lines, complete = recent
+                page = list(self._select(lines, offset, limit, *filters))
+                if complete or len(page) >= limit:
+                    yield from page
+                    return
+
+            if not self.log_file.exists():
+                return
+            with open(self.log_file, 'rb') as f:
+                source = _iter_lines_reversed(f) if newest_first else f
+                yield from self._select(source, offset, limit, *filters)
 
         except Exception as e:
-            logger.error(f"Failed to read audit logs: {e}")
\ No newline at end of file
+            logger.error(f"Failed to read audit logs: {e}")
+
+    @staticmethod
+    def _select(
+        lines,
+        offset: int,
+        limit: int,
+        namespace: Optional[str],
+        environment: Optional[str],
+        action: Optional[str],
+        user_id: Optional[str],
+        ip_address: Optional[str],
+        start_date: Optional[str],
+        end_date: Optional[str]
+    ):
+        """Parse lines and yield the page of entries matching the filters."""
+        skipped = 0
+        yielded = 0
+
+        # A matching line must contain each ASCII filter value as a JSON string
+        # literal (escaped the same way by json and orjson), so lines missing
+        # one are dropped before they are parsed
+        for value in (namespace, environment, action, user_id, ip_address):
+            if value and value.isascii():
+                lines = _containing(lines, orjson.dumps(value))
+
+        for line in lines:
+            try:
+                log_entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+
+            # Apply filters first
+            if namespace and log_entry.get('namespace') != namespace:
+                continue
+            if environment and log_entry.get('environment') != environment:
+                continue
+            if action and log_entry.get('action') != action:
+                continue
+            if user_id and log_entry.get('user_id') != user_id:
+                continue
+            if ip_address and log_entry.get('ip_address') != ip_address:
+                continue
+
+            # Date range filter
+            if start_date or end_date:
+                ts = log_entry.get('timestamp', '')
+                if start_date and ts < start_date:
+                    continue
+                if end_date and ts > end_date:
+                    continue
+
+            # Only count matching entries toward offset
+            if skipped < offset:
+                skipped += 1
+                continue
+
+            if yielded >= limit:
+                break
+
+            yielded += 1
+            yield log_entry
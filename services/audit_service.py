@@ -6,10 +6,9 @@ Provides high-level audit logging interface.
 
 import hashlib
 import sys
-from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
 
-from services.audit_file_logger import AuditFileLogger
+from services.audit_file_logger import AuditFileLogger, utc_timestamp
 from services.audit_constants import SENSITIVE_MARKERS
 
 
@@ -27,11 +26,11 @@ class AuditService:
 
     def _get_timestamp(self) -> str:
         """Get current UTC timestamp in ISO format."""
-        return datetime.now(timezone.utc).isoformat()
+        return utc_timestamp()
 
     def _hash_value(self, value: str) -> str:
-        """Create SHA-256 hash of a value for audit trail."""
-        return hashlib.sha256(value.encode()).hexdigest()[:16]
+        """Create a 64-bit BLAKE2b fingerprint of a value for audit trail."""
+        return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
 
     def _sanitize_field(self, key: str, value: Any) -> Any:
         """Sanitize a field value before writing to persistent audit storage."""
@@ -42,7 +41,7 @@ class AuditService:
 
         lowered = key.lower()
         if any(marker in lowered for marker in SENSITIVE_MARKERS):
-            return f"sha256:{self._hash_value(str(value))}"
+            return f"blake2b:{self._hash_value(str(value))}"
         return value
 
     def _sanitize_for_storage(self, value: Any) -> Any:
@@ -62,7 +61,7 @@ class AuditService:
         sanitized = self._sanitize_for_storage(log_entry)
         self._file_logger.write_entry(sanitized)
 
-    def log_variable_create(
+    def _variable_create_entry(
         self,
         namespace: str,
         environment: str,
@@ -70,9 +69,9 @@ class AuditService:
         value: str,
         user_id: str,
         ip_address: str
-    ):
-        """Log variable creation."""
-        log_entry = {
+    ) -> Dict[str, Any]:
+        """Build the audit entry for a variable creation."""
+        return {
             "timestamp": self._get_timestamp(),
             "action": "CREATE_VARIABLE",
             "namespace": namespace,
@@ -86,9 +85,8 @@ class AuditService:
                 "value_length": len(value)
             }
         }
-        self._write_log(log_entry)
 
-    def log_variable_update(
+    def _variable_update_entry(
         self,
         namespace: str,
         environment: str,
@@ -97,9 +95,11 @@ class AuditService:
         new_value: str,
         user_id: str,
         ip_address: str
-    ):
-        """Log variable update."""
-        log_entry = {
+    ) -> Dict[str, Any]:
+        """Build the audit entry for a variable update."""
+        changed = old_value != new_value
+        new_hash = self._hash_value(new_value)
+        return {
             "timestamp": self._get_timestamp(),
             "action": "UPDATE_VARIABLE",
             "namespace": namespace,
@@ -107,15 +107,70 @@ class AuditService:
             "resource": key,
             "user_id": user_id,
             "ip_address": ip_address,
-            "old_value_hash": self._hash_value(old_value),
-            "new_value_hash": self._hash_value(new_value),
+            # A no-op update hashes the value once for both fields
+            "old_value_hash": self._hash_value(old_value) if changed else new_hash,
+            "new_value_hash": new_hash,
             "details": {
-                "value_changed": old_value != new_value,
+                "value_changed": changed,
                 "old_length": len(old_value),
                 "new_length": len(new_value)
             }
         }
-        self._write_log(log_entry)
+
+    def log_events(self, entries: Iterable[Dict[str, Any]]):
+        """Sanitize several log entries and hand them to the file logger in one batch."""
+        self._file_logger.write_entries(
+            [self._sanitize_for_storage(entry) for entry in entries]
+        )
+
+    def log_variable_create(
+        self,
+        namespace: str,
+        environment: str,
+        key: str,
+        value: str,
+        user_id: str,
+        ip_address: str
+    ):
+        """Log variable creation."""
+        self._write_log(self._variable_create_entry(
+            namespace, environment, key, value, user_id, ip_address
+        ))
+
+    def log_variable_update(
+        self,
+        namespace: str,
+        environment: str,
+        key: str,
+        old_value: str,
+        new_value: str,
+        user_id: str,
+        ip_address: str
+    ):
+        """Log variable update."""
+        self._write_log(self._variable_update_entry(
+            namespace, environment, key, old_value, new_value, user_id, ip_address
+        ))
+
+    def log_variable_changes(
+        self,
+        namespace: str,
+        environment: str,
+        changes: Iterable[Tuple[str, Optional[str], str]],
+        user_id: str,
+        ip_address: str
+    ):
+        """Log a batch of variable writes as one append.
+
+        Each change is (key, old_value, new_value); an old_value of None
+        records a creation, anything else an update.
+        """
+        self.log_events(
+            self._variable_create_entry(namespace, environment, key, new_value, user_id, ip_address)
+            if old_value is None else
+            self._variable_update_entry(namespace, environment, key, old_value, new_value, user_id, ip_address)
+            for key, old_value, new_value in changes
+        )
 
     def log_variable_delete(
         self,
@@ -331,11 +386,11 @@ class AuditService:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None
     ) -> list[Dict[str, Any]]:
-        """Retrieve audit logs with optional filtering and pagination."""
+        """Retrieve audit logs, newest first, with optional filtering and pagination."""
         limit = min(max(1, limit), 1000)
         offset = max(0, offset)
 
-        entries = list(self._file_logger.read_entries(
+        return list(self._file_logger.read_entries(
             offset=offset,
             limit=limit,
             namespace=namespace,
@@ -345,8 +400,8 @@ class AuditService:
             ip_address=ip_address,
             start_date=start_date,
             end_date=end_date,
+            newest_first=True,
         ))
-        return list(reversed(entries))
 
     def count_logs(
         self,
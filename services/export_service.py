@@ -7,6 +7,11 @@ from typing import Dict
 
 import yaml
 
+try:
+    from yaml import CSafeDumper as _YamlDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as _YamlDumper
+
 
 def format_as_env(data: Dict[str, str]) -> str:
     """Format variables as .env file content.
@@ -50,7 +55,7 @@ def format_as_yaml(data: Dict[str, str]) -> str:
     Returns:
         YAML formatted string
     """
-    return yaml.dump(data, default_flow_style=False, allow_unicode=True)
+    return yaml.dump(data, Dumper=_YamlDumper, default_flow_style=False, allow_unicode=True)
 
 
 class ExportService:
@@ -10,9 +10,10 @@ from pathlib import Path
 from threading import Lock
 from typing import Any, Dict, Optional
 
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.fernet import InvalidToken
 
-from core.config import settings, logger, fernet, DATA_DIR, DATA_LOCKS
+from core.config import settings, logger, cipher, DATA_DIR, DATA_LOCKS
+from core.crypto import Crypto
 from core.constants import KEY_PATTERN
 from utils.helpers import validate_segments, get_env_path, _lock_for
 
@@ -24,15 +25,15 @@ class SecretsStore:
     encrypted environment variables.
     """
 
-    def __init__(self, data_dir: str = None, fernet_cipher: Fernet = None):
+    def __init__(self, data_dir: str = None, cipher_instance: Crypto = None):
         """Initialize the secrets store.
 
         Args:
             data_dir: Optional custom data directory path
-            fernet_cipher: Optional custom Fernet cipher instance
+            cipher_instance: Optional custom Crypto instance
         """
         self._data_dir = data_dir or DATA_DIR
-        self._fernet = fernet_cipher or fernet
+        self._cipher = cipher_instance or cipher
 
     @property
     def data_dir(self) -> str:
@@ -56,7 +57,7 @@ class SecretsStore:
             with open(path, "rb") as handle:
                 encrypted_data = handle.read()
         try:
-            decrypted_data = self._fernet.decrypt(encrypted_data)
+            decrypted_data = self._cipher.decrypt(encrypted_data)
             payload = json.loads(decrypted_data.decode("utf-8"))
             if isinstance(payload, dict):
                 return {str(k): str(v) for k, v in payload.items()}
@@ -81,7 +82,7 @@ class SecretsStore:
             k: str(v) for k, v in sorted(data.items()) if KEY_PATTERN.match(k)
         }
         json_data = json.dumps(sanitized, separators=(",", ":")).encode("utf-8")
-        encrypted_data = self._fernet.encrypt(json_data)
+        encrypted_data = self._cipher.encrypt(json_data)
         with _lock_for(path):
             with open(path, "wb") as handle:
                 handle.write(encrypted_data)
@@ -99,6 +100,9 @@ class SecretsStore:
         path = self._get_env_path(namespace, environment)
         if os.path.exists(path):
             os.remove(path)
+            # Imported here: history_manager is only needed on this path
+            from history_manager import get_history_manager
+            get_history_manager().forget_environment(namespace, environment)
             return True
         return False
 
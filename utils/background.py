@@ -0,0 +1,57 @@
+"""
+Background task queue for Secure Environment Manager.
+Runs history writes off the request thread, in submission order.
+"""
+import atexit
+import logging
+import queue
+import threading
+from typing import Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TASKS: queue.Queue[Tuple[Callable[..., Any], tuple, dict]] = queue.Queue()
+_WORKER: threading.Thread | None = None
+_WORKER_LOCK = threading.Lock()
+
+
+def _run() -> None:
+    """Execute queued tasks one at a time, forever."""
+    while True:
+        fn, args, kwargs = _TASKS.get()
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            logger.exception("Background task %s failed", getattr(fn, "__qualname__", fn))
+
+
+def submit(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    """Queue fn(*args, **kwargs) to run on the background worker.
+
+    Callers must pass copies of any mutable arguments they keep using.
+    """
+    global _WORKER
+    if _WORKER is None:
+        with _WORKER_LOCK:
+            if _WORKER is None:
+                _WORKER = threading.Thread(target=_run, name="sem-background", daemon=True)
+                _WORKER.start()
+    _TASKS.put((fn, args, kwargs))
+
+
+def drain() -> None:
+    """Block until every task submitted before this call has run.
+
+    Readers of history call this first so they always see the writes made
+    by earlier requests. Tasks submitted while waiting are not waited for,
+    so a steady stream of writes cannot hold a reader up.
+    """
+    if _WORKER is not None:
+        # The worker runs tasks in order, so the marker is reached only
+        # after everything queued ahead of it
+        done = threading.Event()
+        _TASKS.put((done.set, (), {}))
+        done.wait()
+
+
+atexit.register(drain)
@@ -2,19 +2,22 @@
 Helper utilities for Secure Environment Manager.
 Extracted from app.py for modular architecture.
 """
-import json
 import os
 import re
-from collections import defaultdict
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from threading import Lock
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterable, Tuple
 
 from cryptography.fernet import Fernet, InvalidToken
-from flask import request
+from flask import Response, request
+import orjson
 
-from core.config import settings, logger, fernet, DATA_DIR, API_KEYS_FILE, DATA_LOCKS
-from core.constants import SEGMENT_PATTERN, KEY_PATTERN
+from core.config import settings, logger, cipher, DATA_DIR, API_KEYS_FILE, DATA_LOCKS
+from core.constants import SEGMENT_PATTERN, KEY_PATTERN, ENV_LINE_PATTERN
 
 
 # --- Timezone-aware datetime ---
@@ -28,89 +31,222 @@ def _tz_now() -> datetime:
 # --- Segment Validation ---
 
 
+# Every route validates the same handful of segments; remember the verdicts
+@lru_cache(maxsize=1024)
+def _segment_ok(segment: str) -> bool:
+    """Check a single namespace or environment segment against SEGMENT_PATTERN."""
+    return SEGMENT_PATTERN.match(segment) is not None
+
+
 def validate_segments(namespace: str, environment: str) -> Tuple[str, str]:
     """Validate namespace and environment segments against pattern."""
-    if not SEGMENT_PATTERN.match(namespace):
+    if not _segment_ok(namespace):
         from flask import abort
         abort(404)
-    if not SEGMENT_PATTERN.match(environment):
+    if not _segment_ok(environment):
         from flask import abort
         abort(404)
     return namespace, environment
 
 
+# Bound once so per-key filtering skips the attribute lookup
+_key_match = KEY_PATTERN.match
+
+
 def namespaced_identifier(namespace: str, environment: str) -> str:
     """Create a combined namespace:environment identifier."""
     return f"{namespace}:{environment}"
 
 
+@lru_cache(maxsize=1024)
 def get_env_path(namespace: str, environment: str) -> str:
-    """Get the full path to an environment file."""
+    """Get the full path to an environment file.
+
+    Memoized, so segments are validated and joined once per pair; invalid
+    pairs abort with 404 every time because exceptions are not cached.
+    """
     validate_segments(namespace, environment)
     return os.path.join(DATA_DIR, namespace, f"{environment}.enc")
 
 
+_DATA_LOCKS_GUARD = Lock()
+
+
 def _lock_for(path: str) -> Lock:
-    """Get a lock for the given file path."""
-    return DATA_LOCKS[path]
+    """Get a lock for the given file path, creating it on first use."""
+    with _DATA_LOCKS_GUARD:
+        lock = DATA_LOCKS.get(path)
+        if lock is None:
+            lock = DATA_LOCKS[path] = Lock()
+        return lock
 
 
 # --- API Keys ---
 
+# Parsed api_keys.json, validated against the file's st_mtime_ns
+_API_KEYS_CACHE: Tuple[int, Dict[str, str]] | None = None
+_API_KEYS_LOCK = Lock()
+
 
 def load_api_keys() -> Dict[str, str]:
-    """Load API keys from the api_keys.json file."""
-    if not os.path.exists(API_KEYS_FILE):
-        return {}
+    """Load API keys from the api_keys.json file, reparsing only when it changes."""
+    global _API_KEYS_CACHE
     try:
-        with open(API_KEYS_FILE, "r", encoding="utf-8") as handle:
-            data = json.load(handle)
+        mtime = os.stat(API_KEYS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _API_KEYS_CACHE
+    if cached is not None and cached[0] == mtime:
+        return dict(cached[1])
+    with _API_KEYS_LOCK:
+        cached = _API_KEYS_CACHE
+        if cached is not None and cached[0] == mtime:
+            return dict(cached[1])
+        keys: Dict[str, str] = {}
+        try:
+            with open(API_KEYS_FILE, "rb") as handle:
+                data = orjson.loads(handle.read())
             if isinstance(data, dict):
-                return {str(k): str(v) for k, v in data.items()}
-    except json.JSONDecodeError as exc:
-        logger.error("Unable to parse api_keys file: %s", exc)
-    return {}
+                keys = {str(k): str(v) for k, v in data.items()}
+        except orjson.JSONDecodeError as exc:
+            logger.error("Unable to parse api_keys file: %s", exc)
+        _API_KEYS_CACHE = (mtime, keys)
+        return dict(keys)
+
+
+# --- Templates ---
+
+TEMPLATES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates_config.json")
+
+# Parsed templates_config.json, validated against the file's st_mtime_ns
+_TEMPLATES_CACHE: Tuple[int, Dict[str, Any]] | None = None
+
+
+def load_templates() -> Dict[str, Any] | None:
+    """Load template definitions, reparsing only when the file changes.
+
+    Returns None when templates_config.json does not exist. The returned
+    dict is shared between callers and must not be mutated.
+    """
+    global _TEMPLATES_CACHE
+    try:
+        mtime = os.stat(TEMPLATES_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _TEMPLATES_CACHE
+    if cached is None or cached[0] != mtime:
+        with open(TEMPLATES_FILE, "rb") as handle:
+            templates = orjson.loads(handle.read())
+        cached = _TEMPLATES_CACHE = (mtime, templates if isinstance(templates, dict) else {})
+    return cached[1]
 
 
 # --- Environment Listing ---
 
 
+# Directory listing is re-rendered on many pages but rarely changes; write_vars
+# drops the memo so newly created environments show up immediately.
+_ENV_LISTING_TTL_SECONDS = 1.0
+_ENV_LISTING_CACHE: Tuple[float, Dict[str, list[str]]] | None = None
+
+
+def _scan_environments() -> Dict[str, list[str]]:
+    """Walk DATA_DIR once, using DirEntry type info instead of extra stat calls."""
+    envs: Dict[str, list[str]] = {}
+    try:
+        with os.scandir(DATA_DIR) as namespaces:
+            for ns_entry in namespaces:
+                if not ns_entry.is_dir():
+                    continue
+                with os.scandir(ns_entry.path) as files:
+                    names = [entry.name[:-4] for entry in files if entry.name.endswith(".enc")]
+                if names:
+                    envs[ns_entry.name] = names
+    except FileNotFoundError:
+        return {}
+    return envs
+
+
+def _invalidate_env_listing() -> None:
+    """Forget the memoized environment listing."""
+    global _ENV_LISTING_CACHE
+    _ENV_LISTING_CACHE = None
+
+
 def list_all_environments() -> Dict[str, list[str]]:
     """List all available environments grouped by namespace."""
+    global _ENV_LISTING_CACHE
+    now = time.monotonic()
+    cached = _ENV_LISTING_CACHE
+    if cached is None or now - cached[0] > _ENV_LISTING_TTL_SECONDS:
+        cached = _ENV_LISTING_CACHE = (now, _scan_environments())
     envs = defaultdict(list)
-    if not os.path.exists(DATA_DIR):
-        return envs
-
-    for ns_dir in os.listdir(DATA_DIR):
-        ns_path = os.path.join(DATA_DIR, ns_dir)
-        if os.path.isdir(ns_path):
-            for filename in os.listdir(ns_path):
-                if filename.endswith(".enc"):
-                    env_name = filename[:-4]
-                    envs[ns_dir].append(env_name)
+    for namespace, names in cached[1].items():
+        envs[namespace] = list(names)
     return envs
 
 
 # --- Secret Storage Operations ---
 
+# Decrypted payloads keyed by path, validated against (st_mtime_ns, st_size)
+_VAR_CACHE: OrderedDict[str, Tuple[int, int, Dict[str, str]]] = OrderedDict()
+_VAR_CACHE_LOCK = Lock()
+_VAR_CACHE_MAX = 256
+
+
+def _cache_get(path: str, stat: os.stat_result) -> Dict[str, str] | None:
+    """Return a cached payload if it still matches the file on disk."""
+    with _VAR_CACHE_LOCK:
+        entry = _VAR_CACHE.get(path)
+        if entry is None:
+            return None
+        if entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+            del _VAR_CACHE[path]
+            return None
+        _VAR_CACHE.move_to_end(path)
+        return dict(entry[2])
+
+
+def _cache_put(path: str, stat: os.stat_result, variables: Dict[str, str]) -> None:
+    """Store a decrypted payload, evicting the least recently used entry."""
+    with _VAR_CACHE_LOCK:
+        _VAR_CACHE[path] = (stat.st_mtime_ns, stat.st_size, dict(variables))
+        _VAR_CACHE.move_to_end(path)
+        while len(_VAR_CACHE) > _VAR_CACHE_MAX:
+            _VAR_CACHE.popitem(last=False)
+
+
+def _cache_invalidate(path: str) -> None:
+    """Drop any cached payload for the given path."""
+    with _VAR_CACHE_LOCK:
+        _VAR_CACHE.pop(path, None)
+
 
 def read_vars(namespace: str, environment: str) -> Dict[str, str]:
     """Read and decrypt variables for a namespace/environment."""
     path = get_env_path(namespace, environment)
     if not os.path.exists(path):
+        _cache_invalidate(path)
         return {}
     with _lock_for(path):
+        stat = os.stat(path)
+        cached = _cache_get(path, stat)
+        if cached is not None:
+            return cached
         with open(path, "rb") as handle:
             encrypted_data = handle.read()
     try:
-        decrypted_data = fernet.decrypt(encrypted_data)
-        payload = json.loads(decrypted_data.decode("utf-8"))
+        decrypted_data = cipher.decrypt(encrypted_data)
+        payload = orjson.loads(decrypted_data)
         if isinstance(payload, dict):
-            return {str(k): str(v) for k, v in payload.items()}
+            variables = {str(k): str(v) for k, v in payload.items()}
+            _cache_put(path, stat, variables)
+            return variables
     except InvalidToken:
+        _cache_invalidate(path)
         logger.exception("Decryption failure for %s/%s", namespace, environment)
         return {"error": "Decryption failed. Invalid key or corrupted data."}
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.exception("Invalid JSON payload for %s/%s", namespace, environment)
     return {}
 
@@ -119,26 +255,50 @@ def write_vars(namespace: str, environment: str, data: Dict[str, str]) -> None:
     """Write and encrypt variables for a namespace/environment."""
     path = get_env_path(namespace, environment)
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    sanitized = {k: str(v) for k, v in sorted(data.items()) if KEY_PATTERN.match(k)}
-    json_data = json.dumps(sanitized, separators=(",", ":")).encode("utf-8")
-    encrypted_data = fernet.encrypt(json_data)
+    sanitized = {k: str(v) for k, v in data.items() if _key_match(k)}
+    # Key order is fixed by the serializer so identical data encodes identically
+    encrypted_data = cipher.encrypt(orjson.dumps(sanitized, option=orjson.OPT_SORT_KEYS))
     with _lock_for(path):
         with open(path, "wb") as handle:
             handle.write(encrypted_data)
+        _cache_put(path, os.stat(path), sanitized)
+    _invalidate_env_listing()
+
+
+# Decryption runs in C with the GIL released, so independent files decrypt in parallel
+_IO_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sem-io")
+
+
+def read_vars_many(pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, str]]:
+    """Read and decrypt several namespace/environment pairs concurrently."""
+    pairs = list(dict.fromkeys(pairs))
+    if len(pairs) < 2:
+        return {pair: read_vars(*pair) for pair in pairs}
+    futures = {pair: _IO_POOL.submit(read_vars, *pair) for pair in pairs}
+    return {pair: future.result() for pair, future in futures.items()}
 
 
 # --- Metadata ---
 
 
-def get_metadata(namespace: str, environment: str) -> Dict[str, Any]:
-    """Get metadata about an environment file."""
+def get_metadata(
+    namespace: str, environment: str, variables: Dict[str, str] | None = None
+) -> Dict[str, Any]:
+    """Get metadata about an environment file.
+
+    Pass ``variables`` when the caller already decrypted the environment to
+    avoid reading it a second time.
+    """
     path = get_env_path(namespace, environment)
-    if not os.path.exists(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
         return {"last_modified": None, "variable_count": 0}
-    stat = os.stat(path)
+    if variables is None:
+        variables = read_vars(namespace, environment)
     return {
         "last_modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
-        "variable_count": len(read_vars(namespace, environment)),
+        "variable_count": len(variables),
     }
 
 
@@ -152,15 +312,34 @@ def format_timestamp(dt: datetime | None) -> str | None:
     return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
 
 
+# Escape line breaks so each variable stays on a single .env line
+_ENV_VALUE_ESCAPES = str.maketrans({"\n": "\\n", "\r": "\\r"})
+
+
 def to_env_lines(data: Dict[str, str]) -> str:
-    """Convert a dictionary to .env file format lines."""
-    lines = []
-    for key, value in sorted(data.items()):
-        if not KEY_PATTERN.match(key):
-            continue
-        safe_value = value.replace("\n", "\\n")
-        lines.append(f"{key}={safe_value}")
-    return "\n".join(lines)
+    """Convert a dictionary to .env file format lines.
+
+    Keys are not re-validated here: write_vars only persists keys that match
+    KEY_PATTERN, so everything read back is already safe to emit.
+    """
+    return "\n".join(
+        f"{key}={value.translate(_ENV_VALUE_ESCAPES)}" for key, value in sorted(data.items())
+    )
+
+
+def from_env_lines(payload: str) -> Dict[str, str]:
+    """Parse .env format text into a dictionary, skipping comments and invalid keys.
+
+    Every line boundary str.splitlines() knows is honoured, not only \\n:
+
+    >>> from_env_lines("A=1\\rB=2\\rC=3")
+    {'A': '1', 'B': '2', 'C': '3'}
+    >>> from_env_lines("A=1\\r\\nB=2\\nC=3\\rD=4\\x0cE=5")
+    {'A': '1', 'B': '2', 'C': '3', 'D': '4', 'E': '5'}
+    """
+    # ENV_LINE_PATTERN anchors on \n only, so fold the other line breaks into it
+    payload = "\n".join(payload.splitlines())
+    return {match.group(1): match.group(2).strip() for match in ENV_LINE_PATTERN.finditer(payload)}
 
 
 # --- Response Helpers ---
@@ -168,4 +347,9 @@ def to_env_lines(data: Dict[str, str]) -> str:
 
 def wants_json_response() -> bool:
     """Check if the client prefers JSON response."""
-    return request.path.startswith("/api/") or request.accept_mimetypes["application/json"] >= request.accept_mimetypes["text/html"]
\ No newline at end of file
+    return request.path.startswith("/api/") or request.accept_mimetypes["application/json"] >= request.accept_mimetypes["text/html"]
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Build an application/json response serialized with orjson instead of jsonify."""
+    return Response(orjson.dumps(payload), status=status, mimetype="application/json")